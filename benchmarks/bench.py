@@ -0,0 +1,366 @@
+# Benchmarks for the editor's hot paths, run headless:
+#
+#     python benchmarks/bench.py --output results.json
+#     python benchmarks/bench.py --baseline results.json
+#
+# Each benchmark is run --repeat times and the median is kept. With
+# --baseline, every result is compared with the stored one and the script
+# exits with status 1 if any got worse by more than --threshold.
+import os
+import sys
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import argparse
+import gc
+import json
+import platform
+import statistics
+import tempfile
+import time
+
+from PyQt6.QtCore import QEvent, QEventLoop, QTimer, QT_VERSION_STR
+from PyQt6.QtGui import QTextDocument
+from PyQt6.QtWidgets import QApplication
+
+TIMEOUT_MS = 120 * 1000
+
+# One of each construct the highlighter handles: keywords, strings with
+# escapes, comments, and a triple-quoted string spanning lines.
+TEMPLATE = [
+    "def function_{i}(value, other=None):",
+    '    """Docstring of function {i}."""',
+    "    if value is not None and other:",
+    "        return 'value %d' % value  # trailing comment",
+    "    for item in range({i}):",
+    '        text = "a \\"quoted\\" string with a # inside"',
+    "    notes = '''",
+    "    free text {i}, not code: if else for",
+    "    '''",
+    "",
+]
+
+def make_source(lines):
+    rows = []
+    i = 0
+    while len(rows) < lines:
+        rows.extend(line.format(i=i) for line in TEMPLATE)
+        i += 1
+    return "\n".join(rows[:lines]) + "\n"
+
+def make_file(directory, size):
+    chemin = os.path.join(directory, f"bench_{size}.py")
+    line_count = size // 40 + 1
+    with open(chemin, 'w', encoding='utf-8') as f:
+        f.write(make_source(line_count))
+    return chemin
+
+def resident_memory():
+    # Bytes; Linux only, None elsewhere.
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+def run_loop(loop):
+    timer = QTimer()
+    timer.setSingleShot(True)
+    timer.timeout.connect(loop.quit)
+    timer.start(TIMEOUT_MS)
+    loop.exec()
+    timer.stop()
+
+def wait_until(app, condition):
+    # Runs the event loop until condition() holds. Used rather than waiting
+    # for a signal, which a worker thread may emit before anyone listens.
+    deadline = time.perf_counter() + TIMEOUT_MS / 1000
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise TimeoutError("condition not met in time")
+        app.processEvents(QEventLoop.ProcessEventsFlag.WaitForMoreEvents)
+
+def drain_events(app):
+    # deleteLater() is only honoured by a running event loop; widgets closed
+    # here are deleted explicitly so their timers do not fire mid-benchmark.
+    app.processEvents()
+    app.sendPostedEvents(None, QEvent.Type.DeferredDelete.value)
+
+def median(run, repeat):
+    return statistics.median(run() for _ in range(repeat))
+
+def bench_highlight(results, sizes, repeat):
+    from lexers import PythonHighlighter
+    for lines in sizes:
+        document = QTextDocument()
+        document.setPlainText(make_source(lines))
+        highlighter = PythonHighlighter(document)
+        def run():
+            start = time.perf_counter()
+            highlighter.rehighlight()
+            return time.perf_counter() - start
+        elapsed = median(run, repeat)
+        results[f"highlight.lines_per_s.{lines}"] = (lines / elapsed, "lines/s", "higher")
+        highlighter.setDocument(None)
+
+def bench_lazy_highlight(app, results, lines, repeat):
+    from lexers import LazyHighlighter, compiled_grammar
+    # Time for the background pass to colour the whole document, and the
+    # longest turn of the event loop it took meanwhile.
+    source = make_source(lines)
+    longest = []
+    def run():
+        document = QTextDocument()
+        document.setPlainText(source)
+        highlighter = LazyHighlighter(document, compiled_grammar('python'))
+        slowest = 0
+        start = time.perf_counter()
+        while highlighter.timer.isActive():
+            turn = time.perf_counter()
+            app.processEvents()
+            slowest = max(slowest, time.perf_counter() - turn)
+        elapsed = time.perf_counter() - start
+        longest.append(slowest)
+        highlighter.setDocument(None)
+        return elapsed
+    elapsed = median(run, repeat)
+    results[f"highlight.lazy_lines_per_s.{lines}"] = (lines / elapsed, "lines/s", "higher")
+    results[f"highlight.lazy_longest_turn_ms.{lines}"] = (statistics.median(longest) * 1000, "ms", "lower")
+
+def bench_completion(results, buffers, repeat):
+    from PyQt6.QtGui import QTextCursor
+    from completion import CompletionEngine
+    # A word typed letter by letter, each letter re-indexing its line and
+    # querying the trie, with as many buffers open as given.
+    engine = CompletionEngine()
+    source = make_source(2000)
+    documents = []
+    indexes = []
+    for i in range(buffers):
+        document = QTextDocument()
+        # Without a layout, as outside an editor, no contentsChange is sent.
+        document.documentLayout()
+        indexes.append(engine.attach(document))
+        document.setPlainText(source.replace("function_", f"function_{i}_"))
+        documents.append(document)
+    start = time.perf_counter()
+    while engine.timer.isActive():
+        engine.run_slice()
+    indexed = time.perf_counter() - start
+    keystrokes = []
+    def run():
+        cursor = QTextCursor(documents[0])
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        for i in range(200):
+            cursor.insertText("\n")
+            for letter in f"function_{i % buffers}_1":
+                turn = time.perf_counter()
+                cursor.insertText(letter)
+                engine.complete(cursor.block().text())
+                keystrokes.append(time.perf_counter() - turn)
+        return 0
+    median(run, repeat)
+    keystrokes.sort()
+    results[f"completion.index_ms.{buffers}"] = (indexed * 1000, "ms", "lower")
+    results[f"completion.keystroke_p99_ms.{buffers}"] = (keystrokes[int(len(keystrokes) * 0.99)] * 1000, "ms", "lower")
+    engine.shutdown()
+
+def bench_open(app, window, results, directory, sizes, repeat):
+    from app import EditorWithLines
+    for size in sizes:
+        chemin = make_file(directory, size)
+        label = format_size(size)
+        first_chunk = []
+        loaded = []
+        memory = []
+        for _ in range(repeat):
+            gc.collect()
+            drain_events(app)
+            before = resident_memory()
+            start = time.perf_counter()
+            widget = window.ajouter_onglet(chemin)
+            if isinstance(widget, EditorWithLines):
+                wait_until(app, lambda: not widget.document().isEmpty() or not widget.loading)
+                first_chunk.append(time.perf_counter() - start)
+                wait_until(app, lambda: not widget.loading)
+            loaded.append(time.perf_counter() - start)
+            drain_events(app)
+            if before is not None:
+                memory.append(resident_memory() - before)
+            window.fermer_onglet(window.tabs.indexOf(widget))
+            drain_events(app)
+        if first_chunk:
+            results[f"open.first_chunk_ms.{label}"] = (statistics.median(first_chunk) * 1000, "ms", "lower")
+        results[f"open.loaded_ms.{label}"] = (statistics.median(loaded) * 1000, "ms", "lower")
+        if memory:
+            results[f"open.memory_mb.{label}"] = (statistics.median(memory) / 2**20, "MB", "lower")
+        os.remove(chemin)
+
+def bench_lint(app, window, results, sizes, repeat):
+    from app import EditorWithLines
+    for lines in sizes:
+        editor = EditorWithLines(window, window)
+        editor.set_file_extension(".py")
+        source = make_source(lines)
+        editor.setPlainText(source)
+        editor.lint_timer.stop()
+        times = []
+        # The first pass pays for starting the worker (only once per
+        # process) and fills its caches; it is reported on its own. Every
+        # pass edits the text so no result is served from the cache.
+        for run in range(repeat + 1):
+            editor.setPlainText(source + f"marker_{run} = {run}\n")
+            editor.lint_timer.stop()
+            # The new text is indexed for completion first, so the loop
+            # waiting for the result does not run those slices.
+            while window.completion.timer.isActive():
+                window.completion.run_slice()
+            loop = QEventLoop()
+            received = []
+            apply = EditorWithLines.apply_lint_results
+            def done(diagnostics, editor=editor):
+                received.append(diagnostics)
+                apply(editor, diagnostics)
+                loop.quit()
+            editor.apply_lint_results = done
+            start = time.perf_counter()
+            editor.run_linting()
+            if not received:
+                run_loop(loop)
+            if not received:
+                raise TimeoutError("lint result not received in time")
+            times.append(time.perf_counter() - start)
+        results[f"lint.first_ms.{lines}"] = (times[0] * 1000, "ms", "lower")
+        results[f"lint.round_trip_ms.{lines}"] = (statistics.median(times[1:]) * 1000, "ms", "lower")
+        editor.deleteLater()
+        drain_events(app)
+
+def bench_terminal(app, results, lines, repeat):
+    from terminal import TerminalWidget
+    # Fed the way read_output feeds it: 4 KiB reads, with the event loop
+    # running in between so the flush timer fires as it would live.
+    text = "".join(f"{i:>8} output line from a chatty script\n" for i in range(lines))
+    chunks = [text[i:i + 4096] for i in range(0, len(text), 4096)]
+    def run():
+        terminal = TerminalWidget()
+        start = time.perf_counter()
+        for chunk in chunks:
+            terminal.write(chunk)
+            app.processEvents()
+        terminal.flush_output()
+        elapsed = time.perf_counter() - start
+        terminal.deleteLater()
+        drain_events(app)
+        return elapsed
+    results["terminal.lines_per_s"] = (lines / median(run, repeat), "lines/s", "higher")
+
+def bench_save(app, results, directory, sizes, repeat):
+    from save_service import SaveService
+    service = SaveService()
+    saved = []
+    service.saved.connect(lambda chemin, duree, revision: saved.append(chemin))
+    for size in sizes:
+        text = make_source(size // 40 + 1)
+        chemin = os.path.join(directory, f"save_{size}.py")
+        def run():
+            saved.clear()
+            start = time.perf_counter()
+            service.save(chemin, text, 'utf-8', '\n', 0)
+            wait_until(app, lambda: saved)
+            return time.perf_counter() - start
+        results[f"save.ms.{format_size(size)}"] = (median(run, repeat) * 1000, "ms", "lower")
+        os.remove(chemin)
+    service.shutdown()
+
+def format_size(size):
+    for unit in ("B", "KB", "MB"):
+        if size < 1024 or unit == "MB":
+            return f"{size:g}{unit}"
+        size /= 1024
+
+def run_benchmarks(quick, repeat):
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    from app import EditeurCode
+    from lint_service import shutdown_lint_service
+
+    results = {}
+    window = EditeurCode()
+    # The window's start-up work, gathering completion names, is done
+    # before anything is measured.
+    wait_until(app, lambda: window.completion.trie.static and not window.completion.timer.isActive())
+    with tempfile.TemporaryDirectory() as directory:
+        bench_highlight(results, (1000, 10000) if quick else (1000, 10000, 100000), repeat)
+        bench_lazy_highlight(app, results, 10000 if quick else 100000, repeat)
+        bench_completion(results, 10 if quick else 100, repeat)
+        bench_open(app, window, results, directory,
+                   (100 * 1024, 1024**2) if quick else (100 * 1024, 1024**2, 10 * 1024**2, 32 * 1024**2), repeat)
+        bench_lint(app, window, results, (100, 1000) if quick else (100, 1000, 10000), repeat)
+        bench_terminal(app, results, 20000 if quick else 200000, repeat)
+        bench_save(app, results, directory, (100 * 1024, 1024**2) if quick else (100 * 1024, 1024**2, 10 * 1024**2), repeat)
+
+    shutdown_lint_service()
+    window.save_service.shutdown()
+    window.journal.shutdown()
+    window.completion.shutdown()
+    window.file_model.shutdown()
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "qt": QT_VERSION_STR,
+            "platform": platform.platform(),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "repeat": repeat,
+            "quick": quick,
+        },
+        "results": {
+            name: {"value": round(value, 3), "unit": unit, "better": better}
+            for name, (value, unit, better) in results.items()
+        },
+    }
+
+def compare(report, baseline, threshold):
+    # Prints one row per benchmark; returns the names of the regressions.
+    regressions = []
+    print(f"{'mesure':<34} {'référence':>12} {'actuel':>12} {'écart':>8}")
+    for name, result in report["results"].items():
+        previous = baseline["results"].get(name)
+        if previous is None or not previous["value"]:
+            print(f"{name:<34} {'-':>12} {result['value']:>12.3f}")
+            continue
+        change = result["value"] / previous["value"] - 1
+        worse = change < -threshold if result["better"] == "higher" else change > threshold
+        flag = "  RÉGRESSION" if worse else ""
+        print(f"{name:<34} {previous['value']:>12.3f} {result['value']:>12.3f} {change:>+8.1%}{flag}")
+        if worse:
+            regressions.append(name)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Mesures de performance d'Eraz Editor.")
+    parser.add_argument("--output", help="fichier JSON des résultats (par défaut : sortie standard)")
+    parser.add_argument("--baseline", help="fichier JSON de référence à comparer")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="écart relatif compté comme régression (par défaut : 0.2)")
+    parser.add_argument("--repeat", type=int, default=3, help="exécutions par mesure (par défaut : 3)")
+    parser.add_argument("--quick", action="store_true", help="entrées réduites, pour une vérification rapide")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.quick, max(1, args.repeat))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    elif not args.baseline:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} régression(s) au-delà de {args.threshold:.0%}.")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,96 +1,149 @@
 
+# Imported first: it starts the clock for --startup-profile.
+import startup_profile
 import sys
 import os
-import subprocess
 import re
+import time
 
-from PyQt6.QtCore import Qt, QDir, QTimer
-from PyQt6.QtGui import QFileSystemModel, QKeySequence, QColor, QAction, QTextCharFormat, QSyntaxHighlighter, QTextCursor
+from PyQt6.QtCore import Qt, QDir, QPoint, QStringListModel, QTimer
+from PyQt6.QtGui import QKeySequence, QColor, QAction, QTextCharFormat, QTextCursor
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QFileDialog, QPlainTextEdit, QTabWidget,
-    QSplitter, QMessageBox, QVBoxLayout, QWidget, QTreeView, QLineEdit, QTextEdit,
+    QSplitter, QMessageBox, QVBoxLayout, QWidget, QTreeView, QLineEdit, QTextEdit, QCompleter,
 )
 
-from terminal import TerminalWidget
-
-class PythonHighlighter(QSyntaxHighlighter):
-    def __init__(self, document):
-        super().__init__(document)
-        self.highlighting_rules = []
-
-        keyword_format = QTextCharFormat()
-        keyword_format.setForeground(QColor("#569CD6"))
-        keyword_format.setFontWeight(75)  # 75 = QFont.Bold
-        keywords = [
-            'def', 'class', 'if', 'elif', 'else', 'while', 'for', 'try', 'except', 'finally',
-            'with', 'as', 'return', 'import', 'from', 'pass', 'break', 'continue', 'in', 'not', 'and', 'or', 'is', 'lambda'
-        ]
-        for word in keywords:
-            pattern = re.compile(rf'\b{word}\b')
-            self.highlighting_rules.append((pattern, keyword_format))
-
-        string_format = QTextCharFormat()
-        string_format.setForeground(QColor("#CE9178"))
-        self.highlighting_rules.append((re.compile(r'(\".*?\"|\'.*?\')'), string_format))
-
-        comment_format = QTextCharFormat()
-        comment_format.setForeground(QColor("#6A9955"))
-        self.highlighting_rules.append((re.compile(r'#.*'), comment_format))
-
-    def highlightBlock(self, text):
-        for pattern, fmt in self.highlighting_rules:
-            for match in pattern.finditer(text):
-                start, end = match.span()
-                self.setFormat(start, end - start, fmt)
+from completion import MIN_PREFIX, CompletionEngine, prefix_before
+from documents import DocumentRegistry, canonical_path
+from edit_commands import apply_edit_command, parse_edit_command
+from file_loader import FileLoader
+from file_tree import ProjectTreeModel
+from grep_worker import compile_pattern, shutdown_search_pool
+from instrumentation import StallWatchdog, format_stats, record, snapshot, timed
+from large_file import LARGE_FILE_THRESHOLD, LargeFileView
+from lexers import LazyHighlighter, create_highlighter, grammar_for
+from lint_service import format_diagnostics, lint_service, shutdown_lint_service
+from project_indexer import PathWatcher, ProjectIndexer, index_db_path
+from project_search import ProjectSearch, SearchPanel
+from quick_open import QuickOpen
+from recovery import COMPACT_CHECK_MS, COMPACT_MIN_SIZE, RecoveryJournal, file_stat, pending_journals, remove_journal, replay_journal
+from save_service import SaveService
+from script_runner import ScriptRunner, format_bytes
+from session import HIBERNATE_AFTER, HIBERNATE_CHECK_MS, TabPlaceholder, load_session, save_session
+from terminal import TerminalWidget, terminal_log_path
+
+startup_profile.mark("imports")
 
 class LiveLintingMixin:
     def setup_linting(self):
         self.lint_timer = QTimer(self)
         self.lint_timer.setInterval(1000)
         self.lint_timer.timeout.connect(self.run_linting)
-        self.textChanged.connect(self.lint_timer.start)
+        self.textChanged.connect(self.schedule_linting)
+        self.lint_revision = None
+        self.lint_started = 0.0
+        self.destroyed.connect(lambda _=None, key=id(self): lint_service().cancel(key))
         self.error_format = QTextCharFormat()
         self.error_format.setUnderlineColor(QColor("red"))
         self.error_format.setUnderlineStyle(QTextCharFormat.UnderlineStyle.SpellCheckUnderline)
 
-    def run_linting(self):
-        self.lint_timer.stop()
-        code = self.toPlainText()
+        # Diagnostics live beside the document, keyed by block number, and are
+        # drawn as extra selections for the visible blocks only; linting never
+        # edits the document itself.
+        self.diagnostics = {}
+        self.marked_blocks = ()
+        self.lint_block_count = self.document().blockCount()
+        self.document().contentsChange.connect(self.shift_diagnostics)
+        self.updateRequest.connect(self.viewport_updated)
 
-        import tempfile
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".py", mode="w", encoding="utf-8") as tmp:
-            tmp.write(code)
-            tmp_path = tmp.name
+    def schedule_linting(self):
+        self.cancel_linting()
+        self.lint_timer.start()
 
-        try:
-            result = subprocess.run([
-                "flake8", tmp_path, "--ignore=E501,E302,E305,E701"
-            ], capture_output=True, text=True)
+    def cancel_linting(self):
+        self.lint_revision = None
+        lint_service().cancel(id(self))
 
+    @timed("run_linting")
+    def run_linting(self):
+        self.lint_timer.stop()
+        if self.loading:
+            return
+        # The worker only knows Python; other buffers carry no diagnostics.
+        if grammar_for(self.get_file_extension()) != 'python':
             self.clear_lint_marks()
+            return
 
-            if result.stdout:
-                for line in result.stdout.splitlines():
-                    parts = line.split(":")
-                    if len(parts) >= 2:
-                        try:
-                            lineno = int(parts[1]) - 1
-                            cursor = QTextCursor(self.document().findBlockByNumber(lineno))
-                            cursor.movePosition(QTextCursor.MoveOperation.EndOfBlock)
-                            cursor.movePosition(QTextCursor.MoveOperation.StartOfBlock, QTextCursor.MoveMode.KeepAnchor)
-                            cursor.setCharFormat(self.error_format)
-                        except ValueError:
-                            continue
-        except Exception:
-            pass
-        finally:
-            if os.path.exists(tmp_path):
-                os.remove(tmp_path)
+        # The persistent lint worker runs out of process, so the GUI thread
+        # never waits on it; the result is only applied if the document has
+        # not been edited since the snapshot was taken.
+        self.lint_revision = self.document().revision()
+        self.lint_started = time.perf_counter()
+        lint_service().submit(id(self), self.toPlainText(), self.apply_lint_results)
+
+    def apply_lint_results(self, diagnostics):
+        if self.lint_revision != self.document().revision():
+            return
+        self.lint_revision = None
+        record("lint round trip", time.perf_counter() - self.lint_started)
+
+        self.diagnostics = {}
+        for lineno, column, code, message in diagnostics:
+            self.diagnostics.setdefault(lineno - 1, []).append((column, code, message))
+        self.update_diagnostic_selections()
 
     def clear_lint_marks(self):
-        cursor = QTextCursor(self.document())
-        cursor.select(QTextCursor.SelectionType.Document)
-        cursor.setCharFormat(QTextCharFormat())
+        self.diagnostics = {}
+        self.update_diagnostic_selections()
+
+    def shift_diagnostics(self, position, removed, added):
+        block_count = self.document().blockCount()
+        delta = block_count - self.lint_block_count
+        self.lint_block_count = block_count
+        if not delta or not self.diagnostics:
+            return
+
+        # Keep markers attached to their lines until the next lint pass:
+        # lines after the edit move by the change in block count, and lines
+        # that were removed lose their markers.
+        first = self.document().findBlock(position).blockNumber()
+        shifted = {}
+        for number, marks in self.diagnostics.items():
+            if number <= first:
+                shifted[number] = marks
+            elif number > first - delta:
+                shifted[number + delta] = marks
+        self.diagnostics = shifted
+        self.update_diagnostic_selections()
+
+    def viewport_updated(self, rect, dy):
+        if dy or rect.contains(self.viewport().rect()):
+            self.update_diagnostic_selections()
+
+    def update_diagnostic_selections(self):
+        marked = []
+        if self.diagnostics:
+            block = self.firstVisibleBlock()
+            offset = self.contentOffset()
+            bottom = self.viewport().rect().bottom()
+            while block.isValid() and self.blockBoundingGeometry(block).translated(offset).top() <= bottom:
+                if block.blockNumber() in self.diagnostics:
+                    marked.append(block)
+                block = block.next()
+
+        marked_blocks = tuple(block.blockNumber() for block in marked)
+        if marked_blocks == self.marked_blocks:
+            return
+        self.marked_blocks = marked_blocks
+
+        selections = []
+        for block in marked:
+            selection = QTextEdit.ExtraSelection()
+            selection.format = self.error_format
+            selection.cursor = QTextCursor(block)
+            selection.cursor.movePosition(QTextCursor.MoveOperation.EndOfBlock, QTextCursor.MoveMode.KeepAnchor)
+            selections.append(selection)
+        self.setExtraSelections(selections)
 
 class EditorWithLines(QPlainTextEdit, LiveLintingMixin):
     def __init__(self, parent, editor_code):
@@ -99,17 +152,155 @@ class EditorWithLines(QPlainTextEdit, LiveLintingMixin):
         self.setStyleSheet("background-color: #1e1e1e; color: #dcdcdc; font-family: Consolas; font-size: 14px; border-radius: 6px; padding: 4px;")
         self.setTabStopDistance(4 * self.fontMetrics().horizontalAdvance(' '))
 
-        self.highlighter = PythonHighlighter(self.document())
+        self.chemin = None
+        self.loading = False
+        self.loader = None
+        self.when_loaded = []
+        self.encoding = 'utf-8'
+        self.newline = os.linesep
+
+        # Chosen by set_file_extension; plain text has none.
+        self.highlighter = None
+        self.updateRequest.connect(self.highlight_visible)
         self.setup_linting()
 
+        # Unsaved edits go to the recovery journal as they are made. Its
+        # edits apply to the file as it was loaded or last saved, whose
+        # (size, mtime_ns) is disk_stat.
+        self.journal_size = 0
+        self.disk_stat = None
+        self.document().contentsChange.connect(self.record_change)
+        self.document().modificationChanged.connect(self.modification_changed)
+
+        # The words of the document feed the completion trie shared by all
+        # editors; the popup offers its candidates as a word is typed.
+        self.words = editor_code.completion.attach(self.document())
+        self.completion_prefix = ""
+        self.completion_model = QStringListModel(self)
+        self.completer = QCompleter(self.completion_model, self)
+        self.completer.setWidget(self)
+        self.completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self.completer.popup().setStyleSheet("background-color: #252526; color: #dcdcdc; font-family: Consolas; font-size: 14px;")
+        self.completer.activated.connect(self.insert_completion)
+
         self.file_extension = None
 
-    def set_file_extension(self, ext):
+    def set_file_extension(self, ext, size=0):
         self.file_extension = ext
+        if self.highlighter is not None:
+            self.highlighter.setDocument(None)
+        self.highlighter = create_highlighter(self.document(), ext, size)
 
     def get_file_extension(self):
         return self.file_extension
 
+    def highlight_visible(self, rect, dy):
+        # A lazily highlighted document colours what is on screen first.
+        if isinstance(self.highlighter, LazyHighlighter):
+            lines = self.viewport().height() // max(1, self.fontMetrics().lineSpacing()) + 1
+            self.highlighter.colour_visible(self.firstVisibleBlock(), lines)
+
+    def keyPressEvent(self, event):
+        # While the popup is open, the keys that choose or dismiss are left
+        # to the completer.
+        if self.completer.popup().isVisible() and event.key() in (
+                Qt.Key.Key_Return, Qt.Key.Key_Enter, Qt.Key.Key_Tab, Qt.Key.Key_Backtab, Qt.Key.Key_Escape):
+            event.ignore()
+            return
+        forced = event.key() == Qt.Key.Key_Space and event.modifiers() & Qt.KeyboardModifier.ControlModifier
+        if not forced:
+            super().keyPressEvent(event)
+        typed = event.text()[-1:]
+        if forced or self.completer.popup().isVisible() or typed.isalnum() or typed == "_":
+            self.show_completions(forced)
+
+    @timed("completion")
+    def show_completions(self, forced=False):
+        cursor = self.textCursor()
+        prefix = prefix_before(cursor.block().text()[:cursor.positionInBlock()])
+        candidates = []
+        if not self.isReadOnly() and len(prefix) >= (1 if forced else MIN_PREFIX):
+            candidates = self.editor_code.completion.complete(prefix)
+        popup = self.completer.popup()
+        if not candidates:
+            popup.hide()
+            return
+        self.completion_prefix = prefix
+        self.completion_model.setStringList(candidates)
+        popup.setCurrentIndex(self.completer.completionModel().index(0, 0))
+        rect = self.cursorRect()
+        rect.setWidth(popup.sizeHintForColumn(0) + popup.verticalScrollBar().sizeHint().width())
+        self.completer.complete(rect)
+
+    def insert_completion(self, word):
+        cursor = self.textCursor()
+        cursor.movePosition(QTextCursor.MoveOperation.Left, QTextCursor.MoveMode.KeepAnchor, len(self.completion_prefix))
+        cursor.insertText(word)
+        self.setTextCursor(cursor)
+        self.editor_code.completion.chosen(word)
+
+    def record_change(self, position, removed, added):
+        # Loading the file is not an edit.
+        if self.loading or self.chemin is None:
+            return
+        journal = self.editor_code.journal
+        if self.disk_stat is None and self.chemin not in journal.journaled:
+            # No file to replay the edits on: the journal starts from the
+            # text instead.
+            self.compact_journal()
+            return
+        cursor = QTextCursor(self.document())
+        cursor.setPosition(min(position + added, self.document().characterCount() - 1))
+        cursor.setPosition(position, QTextCursor.MoveMode.KeepAnchor)
+        text = cursor.selectedText().replace('\u2029', '\n')
+        self.journal_size += len(text) + 16
+        journal.record(self.chemin, position, removed, text, self.disk_stat)
+
+    def modification_changed(self, modified):
+        # Saved, or undone back to what was saved: nothing to recover.
+        if not modified and not self.loading and self.chemin is not None:
+            self.journal_size = 0
+            self.editor_code.journal.discard(self.chemin)
+
+    def compact_journal(self):
+        self.journal_size = 0
+        self.editor_code.journal.compact(self.chemin, self.document().toRawText().replace('\u2029', '\n'))
+
+    def start_loading(self):
+        self.loading = True
+        self.setReadOnly(True)
+        self.document().setUndoRedoEnabled(False)
+
+    def append_loaded_text(self, text):
+        first_chunk = self.document().isEmpty()
+        cursor = QTextCursor(self.document())
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.insertText(text)
+        if first_chunk:
+            self.moveCursor(QTextCursor.MoveOperation.Start)
+
+    def finish_loading(self, encoding, newline):
+        self.encoding = encoding
+        self.newline = newline
+        self.loading = False
+        self.document().setUndoRedoEnabled(True)
+        self.document().setModified(False)
+        self.disk_stat = file_stat(self.chemin)
+        self.setReadOnly(False)
+        self.schedule_linting()
+        callbacks, self.when_loaded = self.when_loaded, []
+        for callback in callbacks:
+            callback()
+
+    def after_loading(self, callback):
+        # Runs callback once the file is loaded. Unlike a connection made to
+        # the loader now, it cannot miss a loaded signal already emitted by
+        # the loader's thread.
+        if self.loading:
+            self.when_loaded.append(callback)
+        else:
+            callback()
+
 class EditeurCode(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -121,16 +312,19 @@ class EditeurCode(QMainWindow):
         self.setCentralWidget(self.splitter)
         self.splitter.setSizes([250, 1150])
 
-        self.file_model = QFileSystemModel()
-        self.file_model.setRootPath("")
-        self.file_model.setFilter(QDir.Filter.AllEntries | QDir.Filter.NoDotAndDotDot)
+        # Only the opened folder is listed, lazily and off the GUI thread;
+        # until one is opened the explorer shows the home directory, listed
+        # once the window has been painted.
+        self.file_model = ProjectTreeModel(self)
 
         self.file_explorer = QTreeView()
+        self.file_explorer.setHeaderHidden(True)
+        self.file_explorer.setEditTriggers(QTreeView.EditTrigger.NoEditTriggers)
         self.file_explorer.setModel(self.file_model)
-        self.file_explorer.setRootIndex(self.file_model.index(""))
         self.file_explorer.setStyleSheet("background-color: #252526; color: #dcdcdc; border-radius: 5px;")
         self.file_explorer.doubleClicked.connect(self.ouvrir_fichier_depuis_explorateur)
         self.splitter.addWidget(self.file_explorer)
+        startup_profile.mark("explorateur")
 
         right_widget = QWidget()
         right_layout = QVBoxLayout()
@@ -158,10 +352,17 @@ class EditeurCode(QMainWindow):
         """)
         right_layout.addWidget(self.tabs)
 
-        self.terminal = TerminalWidget()
+        self.search_panel = SearchPanel()
+        self.search_panel.setStyleSheet("background-color: #252526; color: #dcdcdc; border-radius: 5px;")
+        self.search_panel.setFixedHeight(200)
+        self.search_panel.hide()
+        right_layout.addWidget(self.search_panel)
+
+        self.terminal = TerminalWidget(spill_path=terminal_log_path())
         self.terminal.setStyleSheet("background-color: #252526; color: #dcdcdc; border-radius: 5px;")
         self.terminal.setFixedHeight(200)
         right_layout.addWidget(self.terminal)
+        startup_profile.mark("onglets et terminal")
 
         right_widget.setLayout(right_layout)
         self.splitter.addWidget(right_widget)
@@ -199,11 +400,79 @@ class EditeurCode(QMainWindow):
 
         sauvegarder_action = QAction("Sauvegarder fichier", self)
         sauvegarder_action.setShortcut(QKeySequence("Ctrl+S"))
-        sauvegarder_action.triggered.connect(self.sauvegarder_fichier)
+        sauvegarder_action.triggered.connect(lambda: self.sauvegarder_fichier())
         fichier_menu.addAction(sauvegarder_action)
 
+        rechercher_action = QAction("Rechercher un fichier", self)
+        rechercher_action.setShortcut(QKeySequence("Ctrl+P"))
+        rechercher_action.triggered.connect(lambda: self.rechercher_fichier())
+        fichier_menu.addAction(rechercher_action)
+        startup_profile.mark("menus")
+
+        self.statusBar().setStyleSheet("background-color: #007acc; color: white;")
+
+        self.save_service = SaveService(self)
+        self.save_service.saved.connect(self.sauvegarde_terminee)
+        self.save_service.failed.connect(self.sauvegarde_echouee)
+
+        self.completion = CompletionEngine(self)
+
+        self.journal = RecoveryJournal(self)
+        self.journal.failed.connect(
+            lambda chemin, erreur: self.statusBar().showMessage(f"Journal de récupération indisponible pour {chemin} : {erreur}", 5000))
+        self.compaction_timer = QTimer(self)
+        self.compaction_timer.setInterval(COMPACT_CHECK_MS)
+        self.compaction_timer.timeout.connect(self.compacter_journaux)
+        self.compaction_timer.start()
+
+        self.script_runner = ScriptRunner(self)
+        self.script_runner.output.connect(self.terminal.write)
+        self.script_runner.profiled.connect(self.afficher_profil)
+        self.script_runner.finished.connect(self.terminal.append_line)
+        self.terminal.link_activated.connect(self.ouvrir_lien)
+        self.search_panel.result_activated.connect(self.ouvrir_a_la_ligne)
+        # (path, revision, action) of the :run or :profile that waits for
+        # that revision to be saved.
+        self.action_en_attente = None
+        # Path -> revision saved by :wq, whose tab closes once it is on disk.
+        self.fermetures_en_attente = {}
+
         self.dossier_actuel = ""
-        self.tab_data = {}
+        self.documents = DocumentRegistry()
+        self.indexer = None
+        self.symbol_index = None
+        self.path_watcher = None
+        self.recherche = None
+        self.affiche = False
+        self.watchdog = StallWatchdog(self)
+
+        # Tabs left in the background for a while give their document back.
+        self.derniere_activite = {}
+        self.onglet_courant = None
+        self.tabs.currentChanged.connect(self.onglet_active)
+        self.hibernation_timer = QTimer(self)
+        self.hibernation_timer.setInterval(HIBERNATE_CHECK_MS)
+        self.hibernation_timer.timeout.connect(self.hiberner_onglets)
+        self.hibernation_timer.start()
+        startup_profile.mark("services")
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.affiche:
+            self.affiche = True
+            startup_profile.mark("premier affichage")
+            QTimer.singleShot(0, self.initialisation_differee)
+
+    def initialisation_differee(self):
+        # Whatever the first frame does not need waits until it is painted.
+        if self.tabs.count() == 0:
+            self.restaurer_session()
+        self.proposer_recuperation()
+        if not self.file_model.root_path:
+            self.file_model.set_root_path(QDir.homePath())
+        startup_profile.mark("initialisation différée")
+        if startup_profile.enabled():
+            startup_profile.report()
 
     def execute_command_from_bar(self):
         command = self.command_bar.text().strip()
@@ -211,67 +480,92 @@ class EditeurCode(QMainWindow):
         if command:
             self.execute_command(command)
 
+    @timed("execute_command")
     def execute_command(self, command):
+        # Project commands work whatever the current tab holds, if anything.
+        if command == ":find" or command.startswith(":find "):
+            self.rechercher_fichier(command[len(":find"):].strip())
+            return
+        if command == ":grep" or command.startswith(":grep "):
+            self.rechercher_dans_projet(command[len(":grep "):])
+            return
+        if command.startswith((":def ", ":refs ")):
+            name = command.split(maxsplit=1)[1].strip()
+            if self.symbol_index is None:
+                QMessageBox.warning(self, "Erreur", "Aucun dossier ouvert.")
+            elif command.startswith(":def "):
+                self.afficher_symboles(f"Définitions de {name}", self.symbol_index.definitions(name))
+            else:
+                self.afficher_symboles(f"Références à {name}", self.symbol_index.references(name))
+            return
+        if command in (":stats", ":stats json"):
+            self.afficher_statistiques(command == ":stats json")
+            return
+
         current_editor = self.tabs.currentWidget()
-        if not isinstance(current_editor, EditorWithLines):
+        if isinstance(current_editor, LargeFileView):
+            if not (command.startswith(":gt") or command == ":q"):
+                QMessageBox.warning(self, "Erreur", "Fichier volumineux ouvert en lecture seule.")
+                return
+        elif not isinstance(current_editor, EditorWithLines):
             return
 
-        if command == ":dd":
-            cursor = current_editor.textCursor()
-            cursor.select(cursor.SelectionType.BlockUnderCursor)
-            cursor.removeSelectedText()
-            cursor.deleteChar()
-        elif command == ":w":
+        if isinstance(current_editor, EditorWithLines) and self.commande_edition(current_editor, command):
+            return
+
+        if command == ":w":
             self.sauvegarder_fichier()
         elif command == ":wq":
-            self.sauvegarder_fichier()
-            self.fermer_onglet(self.tabs.currentIndex())
+            # The tab closes once the save has succeeded: closing discards
+            # the recovery journal, still needed if the save fails.
+            if self.sauvegarder_fichier():
+                self.fermetures_en_attente[current_editor.chemin] = current_editor.document().revision()
         elif command == ":q":
             self.fermer_onglet(self.tabs.currentIndex())
         elif command == ":run":
-            self.sauvegarder_fichier()
             path = self.get_current_file_name()
             if path and path.endswith(".py"):
-                result = subprocess.run([sys.executable, path], capture_output=True, text=True)
-                output = result.stdout + '\n' + result.stderr
-                self.terminal.clear()
-                self.terminal.appendPlainText(output)
+                if self.script_runner.is_running():
+                    self.statusBar().showMessage("Un script est déjà en cours d'exécution (:stop pour l'arrêter).", 5000)
+                    return
+                self.executer_apres_sauvegarde(lambda: self.lancer_script(path))
             elif path and path.endswith(".html"):
-                import webbrowser
-                webbrowser.open(f"file://{os.path.abspath(path)}")
-                self.terminal.appendPlainText(f"Fichier HTML ouvert dans le navigateur : {path}")
+                self.executer_apres_sauvegarde(lambda: self.ouvrir_navigateur(path))
             else:
                 QMessageBox.warning(self, "Erreur", "Exécution uniquement pour les fichiers Python ou HTML.")
+        elif command == ":stop":
+            self.script_runner.stop()
+        elif command in (":profile", ":profile mem"):
+            path = self.get_current_file_name()
+            if path and path.endswith(".py"):
+                if self.script_runner.is_running():
+                    self.statusBar().showMessage("Un script est déjà en cours d'exécution (:stop pour l'arrêter).", 5000)
+                    return
+                trace_malloc = command == ":profile mem"
+                self.executer_apres_sauvegarde(lambda: self.lancer_script(path, profile=True, trace_malloc=trace_malloc))
+            else:
+                QMessageBox.warning(self, "Erreur", "Profilage uniquement pour les fichiers Python.")
         elif command.startswith(":gt"):
             try:
                 line_number = int(command[3:])
                 if line_number > 0:
-                    block = current_editor.document().findBlockByNumber(line_number - 1)
-                    if block.isValid():
-                        cursor = current_editor.textCursor()
-                        cursor.setPosition(block.position())
-                        current_editor.setTextCursor(cursor)
-                        current_editor.centerCursor()
+                    self.aller_a_la_ligne(current_editor, line_number)
             except ValueError:
                 QMessageBox.warning(self, "Erreur", "Numéro de ligne invalide.")
         elif command == ":lint":
             if self.get_current_file_extension() == ".py":
-                output = self.run_flake8(self.get_current_file_name())
-                msg_box = QMessageBox(self)
-                msg_box.setWindowTitle("Résultats")
-                msg_box.setIcon(QMessageBox.Icon.Information)
-                text_edit = QTextEdit()
-                text_edit.setPlainText(output)
-                text_edit.setReadOnly(True)
-                text_edit.setMinimumSize(600, 400)
-                msg_box.layout().addWidget(text_edit)
-                msg_box.exec()
+                # The buffer, not the file on disk, goes to the lint worker;
+                # the results are shown when they come back.
+                chemin = self.get_current_file_name()
+                lint_service().submit((":lint", id(current_editor)), current_editor.toPlainText(),
+                                      lambda diagnostics: self.afficher_lint(chemin, diagnostics))
+                self.statusBar().showMessage(f"Analyse en cours : {chemin}")
             else:
                 QMessageBox.warning(self, "Erreur", "Linting uniquement pris en charge pour les fichiers Python.")
         elif command == ":rename":
             index = self.file_explorer.currentIndex()
             if index.isValid():
-                old_path = self.file_model.filePath(index)
+                old_path = self.file_model.file_path(index)
                 new_path, _ = QFileDialog.getSaveFileName(self, "Renommer", old_path)
                 if new_path:
                     try:
@@ -282,7 +576,7 @@ class EditeurCode(QMainWindow):
         elif command == ":delete":
             index = self.file_explorer.currentIndex()
             if index.isValid():
-                path = self.file_model.filePath(index)
+                path = self.file_model.file_path(index)
                 try:
                     if os.path.isfile(path):
                         os.remove(path)
@@ -293,14 +587,14 @@ class EditeurCode(QMainWindow):
                 except Exception as e:
                     QMessageBox.warning(self, "Erreur", str(e))
         elif command == ":newfile":
-            dossier = self.file_model.rootDirectory().absolutePath()
+            dossier = self.file_model.root_path
             chemin, _ = QFileDialog.getSaveFileName(self, "Nouveau fichier", dossier)
             if chemin:
                 with open(chemin, 'w', encoding='utf-8') as f:
                     pass
                 self.file_model.refresh()
         elif command == ":newfolder":
-            dossier = self.file_model.rootDirectory().absolutePath()
+            dossier = self.file_model.root_path
             nom = QFileDialog.getExistingDirectory(self, "Nouveau dossier", dossier)
             if nom:
                 try:
@@ -309,26 +603,64 @@ class EditeurCode(QMainWindow):
                 except Exception as e:
                     QMessageBox.warning(self, "Erreur", str(e))
 
-    def run_flake8(self, file_path):
-        disabled_rules = set()
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                if line.startswith("# lint disable"):
-                    parts = line.strip().split()
-                    if len(parts) > 2:
-                        disabled_rules.update(parts[2:])
+    def commande_edition(self, editor, command):
+        # Line commands (:5dd, :10,200d, :%s/a/b/g, :g/motif/d); returns
+        # False if command is not one of them.
+        document = editor.document()
+        try:
+            edit = parse_edit_command(command, editor.textCursor().blockNumber(), document.blockCount())
+        except (ValueError, re.error) as e:
+            QMessageBox.warning(self, "Erreur", f"Commande invalide : {e}")
+            return True
+        if edit is None:
+            return False
+        if editor.isReadOnly():
+            self.statusBar().showMessage("Fichier en cours de chargement.", 5000)
+            return True
+        try:
+            removed, changed = apply_edit_command(document, edit)
+        except re.error as e:
+            QMessageBox.warning(self, "Erreur", f"Remplacement invalide : {e}")
+            return True
+        cursor = editor.textCursor()
+        cursor.setPosition(document.findBlockByNumber(min(edit.first, document.blockCount() - 1)).position())
+        editor.setTextCursor(cursor)
+        if edit.action == "substitute":
+            self.statusBar().showMessage(f"{changed} ligne(s) modifiée(s)", 5000)
+        else:
+            self.statusBar().showMessage(f"{removed} ligne(s) supprimée(s)", 5000)
+        return True
 
-        flake8_command = ["flake8", "--ignore=E501,E302,E305,E701", file_path]
-        if disabled_rules:
-            flake8_command.append(f"--ignore={','.join(disabled_rules)}")
+    def aller_a_la_ligne(self, editor, line_number):
+        if isinstance(editor, LargeFileView):
+            editor.goto_line(line_number)
+            return
+        block = editor.document().findBlockByNumber(line_number - 1)
+        if block.isValid():
+            cursor = editor.textCursor()
+            cursor.setPosition(block.position())
+            editor.setTextCursor(cursor)
+            editor.centerCursor()
 
-        result = subprocess.run(flake8_command, capture_output=True, text=True)
-        return result.stdout
+    def afficher_lint(self, chemin, diagnostics):
+        # Called from the lint service as it reads the worker's output, so
+        # the dialog is opened without a nested event loop.
+        self.statusBar().clearMessage()
+        msg_box = QMessageBox(self)
+        msg_box.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        msg_box.setWindowTitle("Résultats")
+        msg_box.setIcon(QMessageBox.Icon.Information)
+        text_edit = QTextEdit()
+        text_edit.setPlainText(format_diagnostics(chemin, diagnostics))
+        text_edit.setReadOnly(True)
+        text_edit.setMinimumSize(600, 400)
+        msg_box.layout().addWidget(text_edit)
+        msg_box.open()
 
     def get_current_file_name(self):
-        current_index = self.tabs.currentIndex()
-        if current_index != -1:
-            return self.tab_data.get(current_index)
+        widget = self.tabs.currentWidget()
+        if widget is not None:
+            return widget.chemin
         return None
 
     def get_current_file_extension(self):
@@ -340,56 +672,506 @@ class EditeurCode(QMainWindow):
     def ouvrir_fichier(self):
         chemin, _ = QFileDialog.getOpenFileName(self, "Ouvrir un fichier", "")
         if chemin:
-            self.ajouter_onglet(chemin)
+            self.ouvrir_chemin(chemin)
 
     def ouvrir_dossier(self):
         dossier = QFileDialog.getExistingDirectory(self, "Ouvrir un dossier", "")
         if dossier:
-            self.file_explorer.setRootIndex(self.file_model.index(dossier))
+            self.ouvrir_projet(dossier)
+
+    def ouvrir_projet(self, dossier):
+        self.dossier_actuel = dossier
+        self.file_model.set_root_path(dossier)
+        if self.path_watcher is not None:
+            self.path_watcher.stop()
+            self.path_watcher.deleteLater()
+        self.path_watcher = PathWatcher(dossier, self)
+        self.path_watcher.directory_changed.connect(self.file_model.refresh)
+        self.indexer_projet()
+
+    def indexer_projet(self):
+        if self.indexer is not None:
+            self.indexer.requestInterruption()
+            self.indexer.wait()
+        if self.symbol_index is not None:
+            self.symbol_index.close()
+        from symbol_index import SymbolIndex
+        db_path = index_db_path(self.dossier_actuel)
+        self.symbol_index = SymbolIndex(db_path)
+        self.indexer = ProjectIndexer(self.dossier_actuel, db_path, self)
+        self.indexer.progress.connect(self.afficher_progression_index)
+        self.indexer.start()
+
+    def afficher_progression_index(self, done, total):
+        if done < total:
+            self.statusBar().showMessage(f"Indexation : {done}/{total} fichiers")
+        else:
+            self.statusBar().showMessage(f"Index à jour ({total} fichiers analysés)", 5000)
+            self.completion.add_project(index_db_path(self.dossier_actuel))
+
+    def afficher_symboles(self, titre, rows):
+        self.terminal.append_line("")
+        self.terminal.append_line(f"{titre} ({len(rows)})")
+        for path, line, col, kind in rows:
+            relative = os.path.relpath(path, self.dossier_actuel)
+            self.terminal.write_link(f"  {relative}:{line}:{col}  {kind}", path, line)
+
+    def afficher_statistiques(self, exporter=False):
+        stats = snapshot(self.watchdog)
+        if exporter:
+            chemin, _ = QFileDialog.getSaveFileName(self, "Exporter les statistiques", "stats.json", "JSON (*.json)")
+            if chemin:
+                import json
+                try:
+                    with open(chemin, 'w', encoding='utf-8') as f:
+                        json.dump(stats, f, indent=2)
+                except OSError as e:
+                    QMessageBox.warning(self, "Erreur", str(e))
+                else:
+                    self.statusBar().showMessage(f"Statistiques exportées : {chemin}", 5000)
+            return
+        self.terminal.append_line("")
+        for line in format_stats(stats):
+            self.terminal.append_line(line)
+
+    def arreter_indexation(self):
+        if self.indexer is not None:
+            self.indexer.requestInterruption()
+            self.indexer.wait()
+        if self.path_watcher is not None:
+            self.path_watcher.stop()
+
+    def rechercher_fichier(self, texte=""):
+        if self.path_watcher is None:
+            QMessageBox.warning(self, "Erreur", "Aucun dossier ouvert.")
+            return
+        popup = QuickOpen(self.path_watcher, self, texte)
+        popup.file_chosen.connect(self.ouvrir_chemin)
+        popup.move(self.mapToGlobal(QPoint((self.width() - popup.width()) // 2, 60)))
+        popup.show()
 
     def ouvrir_fichier_depuis_explorateur(self, index):
-        chemin = self.file_model.filePath(index)
+        chemin = self.file_model.file_path(index)
         if os.path.isfile(chemin):
-            self.ajouter_onglet(chemin)
+            self.ouvrir_chemin(chemin)
 
     def creer_fichier(self):
         chemin, _ = QFileDialog.getSaveFileName(self, "Créer un fichier", "", "Tous les fichiers (*)")
         if chemin:
             with open(chemin, 'w', encoding='utf-8') as f:
                 pass
-            self.ajouter_onglet(chemin)
+            self.ouvrir_chemin(chemin)
             QMessageBox.information(self, "Fichier créé", f"Le fichier '{chemin}' a été créé avec succès.")
 
+    @timed("sauvegarder_fichier")
     def sauvegarder_fichier(self):
-        current_index = self.tabs.currentIndex()
-        if current_index != -1:
-            chemin = self.tab_data.get(current_index)
-            if chemin:
-                editor = self.tabs.currentWidget()
-                with open(chemin, 'w', encoding='utf-8') as f:
-                    f.write(editor.toPlainText())
-                QMessageBox.information(self, "Sauvegarde", f"Fichier sauvegardé : {chemin}")
+        # True if a save was queued.
+        editor = self.tabs.currentWidget()
+        if editor is not None:
+            chemin = editor.chemin
+            if isinstance(editor, LargeFileView):
+                QMessageBox.warning(self, "Erreur", "Fichier volumineux ouvert en lecture seule.")
+            elif not isinstance(editor, EditorWithLines):
+                # A placeholder whose file could not be loaded.
+                QMessageBox.warning(self, "Erreur", "Onglet non chargé.")
+            elif editor.loading:
+                # Only part of the file is in the buffer yet.
+                self.statusBar().showMessage("Fichier en cours de chargement.", 5000)
+            elif chemin:
+                # Only the snapshot is taken here; the write happens on the
+                # save service's thread and reports back in the status bar.
+                self.save_service.save(chemin, editor.toPlainText(), editor.encoding, editor.newline,
+                                       editor.document().revision())
+                self.statusBar().showMessage(f"Sauvegarde en cours : {chemin}")
+                return True
             else:
                 QMessageBox.warning(self, "Erreur", "Chemin du fichier introuvable.")
         else:
             QMessageBox.warning(self, "Erreur", "Aucun fichier ouvert.")
+        return False
+
+    def sauvegarde_terminee(self, chemin, duree, revision):
+        # Only the save of the current text makes the buffer unmodified; an
+        # older snapshot may finish before a later save of the same buffer.
+        editor = self.documents.get(chemin)
+        if isinstance(editor, EditorWithLines):
+            editor.disk_stat = file_stat(chemin)
+            if revision == editor.document().revision():
+                editor.document().setModified(False)
+            elif editor.document().isModified():
+                # Edited while saving: the journal no longer applies to the
+                # file on disk.
+                editor.compact_journal()
+        self.statusBar().showMessage(f"Fichier sauvegardé : {chemin} ({duree * 1000:.0f} ms)", 5000)
+        # Revisions only grow: a later save of the same buffer, which may
+        # have replaced the queued snapshot of :wq, counts too.
+        attendue = self.fermetures_en_attente.get(chemin)
+        if attendue is not None and revision >= attendue:
+            del self.fermetures_en_attente[chemin]
+            # Not if something was typed since.
+            if isinstance(editor, EditorWithLines) and not editor.document().isModified():
+                self.fermer_onglet(self.tabs.indexOf(editor))
+        if self.action_en_attente and self.action_en_attente[0] == chemin and revision >= self.action_en_attente[1]:
+            action = self.action_en_attente[2]
+            self.action_en_attente = None
+            action()
+
+    def executer_apres_sauvegarde(self, action):
+        # The save is asynchronous: the action (script, browser) runs once
+        # the save service reports the current text as written, and not at
+        # all if the save is refused or fails.
+        editor = self.tabs.currentWidget()
+        if self.sauvegarder_fichier():
+            self.action_en_attente = (editor.chemin, editor.document().revision(), action)
+
+    def lancer_script(self, chemin, profile=False, trace_malloc=False):
+        self.terminal.clear_output()
+        self.terminal.append_line(f"$ python {chemin}")
+        self.script_runner.start(chemin, profile, trace_malloc)
+
+    def ouvrir_navigateur(self, chemin):
+        import webbrowser
+        webbrowser.open(f"file://{os.path.abspath(chemin)}")
+        self.terminal.append_line(f"Fichier HTML ouvert dans le navigateur : {chemin}")
+
+    def afficher_profil(self, stats):
+        if stats.get("hotspots"):
+            self.terminal.append_line("")
+            self.terminal.append_line("Fonctions les plus coûteuses (temps cumulé) :")
+            self.terminal.append_line(f"{'cumul (s)':>10} {'propre (s)':>10} {'appels':>8}  fonction")
+            for filename, line, function, ncalls, tottime, cumtime in stats["hotspots"]:
+                row = f"{cumtime:>10.3f} {tottime:>10.3f} {ncalls:>8}  {os.path.basename(filename)}:{line} {function}"
+                self.ecrire_ligne_cliquable(row, filename, line)
+        if stats.get("allocations"):
+            self.terminal.append_line("")
+            self.terminal.append_line(f"Allocations encore actives en fin d'exécution (pic tracé : {format_bytes(stats['traced_peak'])}) :")
+            self.terminal.append_line(f"{'taille':>10} {'blocs':>8}  ligne")
+            for filename, line, size, count in stats["allocations"]:
+                row = f"{format_bytes(size):>10} {count:>8}  {os.path.basename(filename)}:{line}"
+                self.ecrire_ligne_cliquable(row, filename, line)
+
+    def ecrire_ligne_cliquable(self, text, chemin, ligne):
+        if ligne > 0 and os.path.isfile(chemin):
+            self.terminal.write_link(text, chemin, ligne)
+        else:
+            self.terminal.append_line(text)
+
+    def rechercher_dans_projet(self, motif):
+        # A new query cancels the one still running; ":grep" alone just
+        # closes the results.
+        self.arreter_recherche()
+        if not motif:
+            self.search_panel.hide()
+            return
+        if not self.dossier_actuel:
+            QMessageBox.warning(self, "Erreur", "Aucun dossier ouvert.")
+            return
+        try:
+            compile_pattern(motif)
+        except re.error as e:
+            QMessageBox.warning(self, "Erreur", f"Expression invalide : {e}")
+            return
+        self.search_panel.start(self.dossier_actuel, motif)
+        self.recherche = ProjectSearch(self.dossier_actuel, motif, self)
+        self.recherche.found.connect(self.afficher_resultats)
+        self.recherche.completed.connect(self.recherche_terminee)
+        self.recherche.start()
+
+    # Results of a cancelled search may still be queued; only the current
+    # search gets through.
+    def afficher_resultats(self, rows):
+        if self.sender() is self.recherche:
+            self.search_panel.add_results(rows)
+
+    def recherche_terminee(self, files, hits, truncated):
+        if self.sender() is self.recherche:
+            self.search_panel.finish(files, hits, truncated)
+
+    def arreter_recherche(self):
+        if self.recherche is not None:
+            self.recherche.requestInterruption()
+            self.recherche.wait()
+            self.recherche.deleteLater()
+            self.recherche = None
+
+    def ouvrir_chemin(self, chemin):
+        # A file already open is only brought to the front. None if the
+        # file cannot be opened.
+        editor = self.documents.get(chemin)
+        if editor is None:
+            editor = self.ajouter_onglet(chemin)
+        if editor is None:
+            QMessageBox.warning(self, "Erreur", f"Impossible d'ouvrir {chemin} : fichier introuvable ou illisible.")
+            return None
+        self.tabs.setCurrentWidget(editor)
+        # Showing a placeholder tab replaces it with the loaded editor.
+        return self.tabs.currentWidget()
 
+    def ouvrir_a_la_ligne(self, chemin, ligne):
+        editor = self.ouvrir_chemin(chemin)
+        if editor is None:
+            return
+        if isinstance(editor, EditorWithLines):
+            editor.after_loading(lambda: self.aller_a_la_ligne(editor, ligne))
+        elif isinstance(editor, LargeFileView):
+            self.aller_a_la_ligne(editor, ligne)
+
+    def ouvrir_lien(self, chemin, ligne):
+        # The symbol index lags behind the disk: a result may name a file
+        # deleted since it was indexed.
+        if not os.path.isfile(chemin):
+            self.terminal.append_line(f"Fichier introuvable : {chemin}")
+            return
+        self.ouvrir_a_la_ligne(chemin, ligne)
+
+    def sauvegarde_echouee(self, chemin, erreur, revision):
+        # The tab of a failed :wq stays open, with its journal.
+        attendue = self.fermetures_en_attente.get(chemin)
+        if attendue is not None and revision >= attendue:
+            del self.fermetures_en_attente[chemin]
+        if self.action_en_attente and self.action_en_attente[0] == chemin and revision >= self.action_en_attente[1]:
+            self.action_en_attente = None
+        self.statusBar().clearMessage()
+        QMessageBox.warning(self, "Erreur", f"Échec de la sauvegarde de {chemin} : {erreur}")
+
+    @timed("ajouter_onglet")
     def ajouter_onglet(self, chemin):
+        widget = self.creer_editeur(canonical_path(chemin))
+        if widget is None:
+            return None
+        self.tabs.addTab(widget, os.path.basename(chemin))
+        self.documents.add(widget)
+        self.derniere_activite[widget] = time.monotonic()
+        return widget
+
+    def creer_editeur(self, chemin):
+        # None if the file is gone or cannot be read.
+        try:
+            taille = os.path.getsize(chemin)
+            if taille >= LARGE_FILE_THRESHOLD:
+                return LargeFileView(chemin)
+        except OSError:
+            return None
+
         editor = EditorWithLines(self, self)
-        with open(chemin, 'r', encoding='utf-8') as f:
-            editor.setPlainText(f.read())
+        editor.chemin = chemin
         file_extension = os.path.splitext(chemin)[1]
-        editor.set_file_extension(file_extension)
-        tab_index = self.tabs.addTab(editor, os.path.basename(chemin))
-        self.tab_data[tab_index] = chemin
+        editor.set_file_extension(file_extension, taille)
+
+        # The file is read and decoded on a worker thread and streamed into
+        # the editor chunk by chunk, so the event loop keeps running.
+        editor.start_loading()
+        loader = FileLoader(chemin, editor)
+        loader.chunk_loaded.connect(editor.append_loaded_text)
+        loader.progress.connect(lambda percent: self.afficher_progression(editor, percent))
+        loader.loaded.connect(editor.finish_loading)
+        loader.finished.connect(lambda: self.afficher_progression(editor, None))
+        loader.failed.connect(lambda erreur: self.chargement_echoue(editor, erreur))
+        editor.loader = loader
+        loader.start()
+        return editor
+
+    def chargement_echoue(self, editor, erreur):
+        # Whatever was read is not the file: its tab is closed rather than
+        # left to be edited, and saved over the whole file.
+        index = self.tabs.indexOf(editor)
+        if index != -1:
+            self.fermer_onglet(index)
+        QMessageBox.warning(self, "Erreur", f"Impossible de lire {editor.chemin} : {erreur}")
+
+    def afficher_progression(self, editor, percent):
+        index = self.tabs.indexOf(editor)
+        if index == -1:
+            return
+        nom = os.path.basename(editor.chemin)
+        self.tabs.setTabText(index, nom if percent is None else f"{nom} ({percent}%)")
 
     def fermer_onglet(self, index):
-        if index in self.tab_data:
-            del self.tab_data[index]
+        widget = self.tabs.widget(index)
+        self.tabs.removeTab(index)
+        if widget is not None:
+            self.liberer_editeur(widget)
+
+    def liberer_editeur(self, widget):
+        self.documents.remove(widget)
+        self.derniere_activite.pop(widget, None)
+        if isinstance(widget, LargeFileView):
+            widget.release()
+        elif isinstance(widget, EditorWithLines):
+            self.journal.discard(widget.chemin)
+            widget.words.release()
+            if widget.loader is not None:
+                widget.loader.requestInterruption()
+                widget.loader.wait()
+        widget.deleteLater()
+
+    def remplacer_onglet(self, index, widget):
+        titre = self.tabs.tabText(index)
+        courant = self.tabs.currentIndex() == index
+        self.tabs.blockSignals(True)
         self.tabs.removeTab(index)
+        self.tabs.insertTab(index, widget, titre)
+        self.documents.add(widget)
+        if courant:
+            self.tabs.setCurrentIndex(index)
+        self.tabs.blockSignals(False)
+
+    def onglet_active(self, index):
+        maintenant = time.monotonic()
+        if self.onglet_courant in self.derniere_activite:
+            self.derniere_activite[self.onglet_courant] = maintenant
+        widget = self.tabs.widget(index)
+        if isinstance(widget, TabPlaceholder):
+            widget = self.reveiller_onglet(index)
+        self.onglet_courant = widget
+        if widget is not None:
+            self.derniere_activite[widget] = maintenant
+
+    def reveiller_onglet(self, index):
+        placeholder = self.tabs.widget(index)
+        widget = self.creer_editeur(placeholder.chemin)
+        if widget is None:
+            placeholder.label.setText(f"Impossible d'ouvrir {placeholder.chemin} : fichier introuvable ou illisible.")
+            return placeholder
+        self.remplacer_onglet(index, widget)
+        self.restaurer_position(widget, placeholder.cursor, placeholder.scroll)
+        placeholder.deleteLater()
+        return widget
+
+    def hiberner_onglets(self):
+        # Only unmodified files are dropped: they can be read back from disk.
+        limite = time.monotonic() - HIBERNATE_AFTER
+        for index in range(self.tabs.count()):
+            widget = self.tabs.widget(index)
+            if index == self.tabs.currentIndex() or self.derniere_activite.get(widget, 0) > limite:
+                continue
+            if isinstance(widget, EditorWithLines) and (widget.loading or widget.document().isModified()):
+                continue
+            if isinstance(widget, (EditorWithLines, LargeFileView)):
+                position, defilement = self.position_onglet(widget)
+                self.remplacer_onglet(index, TabPlaceholder(widget.chemin, position, defilement))
+                self.liberer_editeur(widget)
+        self.sauvegarder_session()
+
+    def position_onglet(self, widget):
+        if isinstance(widget, EditorWithLines):
+            return widget.textCursor().position(), widget.verticalScrollBar().value()
+        if isinstance(widget, TabPlaceholder):
+            return widget.cursor, widget.scroll
+        return 0, 0
+
+    def restaurer_position(self, editor, position, defilement):
+        if not isinstance(editor, EditorWithLines):
+            return
+        if editor.loading:
+            editor.after_loading(lambda: self.restaurer_position(editor, position, defilement))
+            return
+        cursor = editor.textCursor()
+        cursor.setPosition(min(position, editor.document().characterCount() - 1))
+        editor.setTextCursor(cursor)
+        editor.verticalScrollBar().setValue(defilement)
+
+    def compacter_journaux(self):
+        # A journal that outgrew its document is replaced by a snapshot.
+        for editor in self.documents.widgets.values():
+            if isinstance(editor, EditorWithLines) and \
+                    editor.journal_size > max(COMPACT_MIN_SIZE, editor.document().characterCount()):
+                editor.compact_journal()
+
+    def proposer_recuperation(self):
+        # Journals left behind by a crash hold the unsaved edits of their
+        # buffers; each recovered buffer is opened with them applied.
+        journaux = pending_journals()
+        if not journaux:
+            return
+        noms = "\n".join(chemin for chemin, _ in journaux)
+        reponse = QMessageBox.question(
+            self, "Récupération",
+            f"Des modifications non enregistrées ont été retrouvées après un arrêt inattendu :\n\n{noms}\n\nLes récupérer ?")
+        echecs = 0
+        for chemin, journal in journaux:
+            if reponse != QMessageBox.StandardButton.Yes:
+                remove_journal(journal)
+                continue
+            texte = replay_journal(journal)
+            editor = self.ouvrir_chemin(chemin) if texte is not None and os.path.isfile(chemin) else None
+            if not isinstance(editor, EditorWithLines):
+                echecs += 1
+                remove_journal(journal)
+            else:
+                editor.after_loading(lambda e=editor, t=texte, j=journal: self.appliquer_recuperation(e, t, j))
+        if echecs:
+            self.statusBar().showMessage(f"{echecs} fichier(s) n'ont pas pu être récupérés", 5000)
+
+    def appliquer_recuperation(self, editor, texte, journal):
+        # One edit, so a single undo goes back to the file as saved. Its
+        # journal replaces the old one.
+        if editor.document().toRawText().replace('\u2029', '\n') == texte:
+            remove_journal(journal)
+            return
+        cursor = QTextCursor(editor.document())
+        cursor.beginEditBlock()
+        cursor.select(QTextCursor.SelectionType.Document)
+        cursor.insertText(texte)
+        cursor.endEditBlock()
+
+    def sauvegarder_session(self):
+        onglets = []
+        for index in range(self.tabs.count()):
+            widget = self.tabs.widget(index)
+            position, defilement = self.position_onglet(widget)
+            onglets.append({"path": widget.chemin, "cursor": position, "scroll": defilement})
+        session = {
+            "folder": self.dossier_actuel,
+            "current": self.get_current_file_name(),
+            "tabs": onglets,
+        }
+        try:
+            save_session(session)
+        except OSError:
+            pass
+
+    def restaurer_session(self):
+        # Every tab comes back as a placeholder; only the current one is
+        # loaded, the others when they are first shown.
+        session = load_session()
+        if not session:
+            return
+        dossier = session.get("folder")
+        if dossier and os.path.isdir(dossier):
+            self.ouvrir_projet(dossier)
+        self.tabs.blockSignals(True)
+        for onglet in session.get("tabs", []):
+            chemin = onglet.get("path")
+            if not chemin or not os.path.isfile(chemin) or chemin in self.documents:
+                continue
+            placeholder = TabPlaceholder(canonical_path(chemin), onglet.get("cursor", 0), onglet.get("scroll", 0))
+            self.tabs.addTab(placeholder, os.path.basename(chemin))
+            self.documents.add(placeholder)
+        courant = self.documents.get(session.get("current") or "")
+        if courant is not None:
+            self.tabs.setCurrentWidget(courant)
+        self.tabs.blockSignals(False)
+        if self.tabs.count():
+            self.onglet_active(self.tabs.currentIndex())
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
+    app.setApplicationName("Eraz Editor")
+    startup_profile.mark("QApplication")
     fenetre = EditeurCode()
     fenetre.show()
+    startup_profile.mark("show")
+    app.aboutToQuit.connect(fenetre.sauvegarder_session)
+    app.aboutToQuit.connect(shutdown_lint_service)
+    app.aboutToQuit.connect(fenetre.save_service.shutdown)
+    app.aboutToQuit.connect(fenetre.journal.shutdown)
+    app.aboutToQuit.connect(fenetre.completion.shutdown)
+    app.aboutToQuit.connect(fenetre.script_runner.stop)
+    app.aboutToQuit.connect(fenetre.arreter_indexation)
+    app.aboutToQuit.connect(fenetre.watchdog.stop)
+    app.aboutToQuit.connect(fenetre.terminal.shutdown)
+    app.aboutToQuit.connect(fenetre.arreter_recherche)
+    app.aboutToQuit.connect(shutdown_search_pool)
+    app.aboutToQuit.connect(fenetre.file_model.shutdown)
     sys.exit(app.exec())
@@ -0,0 +1,454 @@
+import heapq
+import math
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from itertools import chain, islice
+
+from PyQt6.QtCore import QObject, QThread, QTimer, pyqtSignal
+
+from instrumentation import timed
+
+WORD = re.compile(r"[^\W\d]\w*")
+WORD_BEFORE = re.compile(r"(?<!\w)[^\W\d]\w*$")
+IMPORT = re.compile(r"\s*(?:from\s+([^\W\d]\w*)|import\s+([^\W\d]\w*(?:\s*,\s*[^\W\d]\w*)*))")
+
+# Shorter words are not worth completing, longer ones are not identifiers
+# anyone types.
+MIN_WORD_LENGTH = 3
+MAX_WORD_LENGTH = 64
+
+# The popup opens by itself once this many characters of a word are typed.
+MIN_PREFIX = 2
+MAX_CANDIDATES = 12
+
+# Candidates rank by how often they occur in the open buffers, on a log
+# scale. A word just chosen from the popup ranks as if it occurred
+# 2 ** RECENCY_BONUS times more, a bonus halved with every
+# RECENCY_HALF_LIFE later choices; only the last RECENT_WORDS chosen are
+# remembered.
+RECENCY_BONUS = 4
+RECENCY_HALF_LIFE = 10
+RECENT_WORDS = 100
+
+# Edits spanning this many lines are scanned in the background, in slices
+# of SLICE_BUDGET seconds per turn of the event loop.
+SCAN_NOW_BLOCKS = 50
+SLICE_BUDGET = 0.005
+# Words reach or leave the trie in batches of this many, so that the time
+# can be checked in between.
+TRIE_BATCH = 64
+
+# Importing these does something besides defining names.
+UNSAFE_MODULES = {"__main__", "antigravity", "idlelib", "this", "tkinter", "turtle", "turtledemo"}
+
+class TrieNode:
+    # best caches the most frequent words below the node, and is cleared on
+    # the path of every word whose count changes.
+    __slots__ = ("children", "word", "best")
+
+    def __init__(self):
+        self.children = {}
+        self.word = None
+        self.best = None
+
+class PrefixTrie:
+    # Every candidate word, with its number of occurrences in the open
+    # buffers. Words enter or leave the trie only when they first appear or
+    # last disappear; other changes only clear caches on their path.
+    def __init__(self):
+        self.root = TrieNode()
+        self.counts = {}
+        self.static = set()
+        self.recent = {}
+        self.tick = 0
+
+    def add(self, words):
+        counts = self.counts
+        for word, n in words.items():
+            old = counts.get(word, 0)
+            counts[word] = old + n
+            self.touch(word, insert=not old and word not in self.static)
+
+    def remove(self, words):
+        counts = self.counts
+        for word, n in words.items():
+            left = counts[word] - n
+            if left:
+                counts[word] = left
+                self.touch(word)
+            else:
+                del counts[word]
+                if word in self.static:
+                    self.touch(word)
+                else:
+                    self.delete(word)
+
+    def add_static(self, words):
+        # Keywords, builtins and other names offered whether or not a buffer
+        # uses them.
+        for word in words:
+            if word not in self.static and MIN_WORD_LENGTH <= len(word) <= MAX_WORD_LENGTH:
+                self.static.add(word)
+                if word not in self.counts:
+                    self.touch(word, insert=True)
+
+    def touch(self, word, insert=False):
+        node = self.root
+        node.best = None
+        for char in word:
+            child = node.children.get(char)
+            if child is None:
+                if not insert:
+                    return
+                child = node.children[char] = TrieNode()
+            node = child
+            node.best = None
+        if insert:
+            node.word = word
+
+    def delete(self, word):
+        path = []
+        node = self.root
+        for char in word:
+            node.best = None
+            path.append((node, char))
+            node = node.children[char]
+        node.word = None
+        node.best = None
+        for parent, char in reversed(path):
+            child = parent.children[char]
+            if child.word is not None or child.children:
+                break
+            del parent.children[char]
+
+    def chosen(self, word):
+        self.tick += 1
+        self.recent.pop(word, None)
+        self.recent[word] = self.tick
+        if len(self.recent) > RECENT_WORDS:
+            del self.recent[next(iter(self.recent))]
+
+    def rank(self, word):
+        return self.counts.get(word, 0), -len(word)
+
+    def best(self, node):
+        if node.best is None:
+            children = node.children
+            if node.word is None and len(children) == 1:
+                # Most nodes are links in a chain of single letters.
+                node.best = self.best(next(iter(children.values())))
+            elif not children:
+                node.best = (node.word,)
+            else:
+                found = [node.word] if node.word is not None else []
+                for child in children.values():
+                    found.extend(self.best(child))
+                node.best = tuple(heapq.nlargest(MAX_CANDIDATES + 1, found, key=self.rank))
+        return node.best
+
+    def warm_up(self, deadline):
+        # Fills the caches bottom-up, each node once its children are done,
+        # until the deadline; returns True when the whole trie is cached.
+        stack = [(self.root, False)] if self.root.best is None else []
+        while stack:
+            node, expanded = stack.pop()
+            if expanded:
+                self.best(node)
+                if time.perf_counter() > deadline:
+                    return False
+                continue
+            stack.append((node, True))
+            stack.extend((child, False) for child in node.children.values() if child.best is None)
+        return True
+
+    def complete(self, prefix):
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        # The most frequent words are cached; the few recently chosen are
+        # added to them, then both are ranked with the recency bonus.
+        candidates = set(self.best(node))
+        candidates.update(
+            word for word in self.recent
+            if word.startswith(prefix) and (word in self.counts or word in self.static)
+        )
+        candidates.discard(prefix)
+
+        def score(word):
+            count, length = self.rank(word)
+            frequency = math.log2(1 + count)
+            used = self.recent.get(word)
+            if used is not None:
+                frequency += RECENCY_BONUS * 0.5 ** ((self.tick - used) / RECENCY_HALF_LIFE)
+            return frequency, length
+        return heapq.nlargest(MAX_CANDIDATES, candidates, key=score)
+
+def prefix_before(text):
+    # The part of a word typed before the cursor, given the text before it.
+    match = WORD_BEFORE.search(text)
+    return match.group() if match else ""
+
+def words_of(text):
+    intern = sys.intern
+    return tuple(
+        intern(word) for word in WORD.findall(text) if MIN_WORD_LENGTH <= len(word) <= MAX_WORD_LENGTH
+    )
+
+class BufferWords:
+    # The words of one document, block by block, kept in step with its
+    # contentsChange: only the blocks an edit touched are scanned again, and
+    # only the difference in counts reaches the trie. Blocks of large edits,
+    # such as the chunks of a file being loaded or a :%s, are left as None
+    # and scanned by the engine in slices; the blocks they replaced wait in
+    # replaced, and their words leave the trie in slices too.
+    def __init__(self, engine, document):
+        self.engine = engine
+        self.document = document
+        self.blocks = [()] * document.blockCount()
+        self.scan_from = len(self.blocks)
+        self.replaced = []
+        self.dropped = Counter()
+        document.contentsChange.connect(self.contents_changed)
+
+    def contents_changed(self, position, removed, added):
+        document = self.document
+        end = min(position + added, document.characterCount() - 1)
+        first = document.findBlock(position).blockNumber()
+        last = document.findBlock(end).blockNumber()
+        old_last = last - (document.blockCount() - len(self.blocks))
+
+        replaced = self.blocks[first:old_last + 1]
+        if last - first >= SCAN_NOW_BLOCKS:
+            self.replaced.extend(replaced)
+            self.blocks[first:old_last + 1] = [None] * (last - first + 1)
+            self.scan_from = min(self.scan_from, first)
+            self.engine.schedule_scan(self)
+            return
+
+        old = Counter()
+        for words in replaced:
+            if words is not None:
+                old.update(words)
+        block = document.findBlock(position)
+        new = []
+        current = Counter()
+        for _ in range(last - first + 1):
+            words = self.scan_block(block)
+            new.append(words)
+            current.update(words)
+            block = block.next()
+        self.blocks[first:old_last + 1] = new
+        # Unscanned blocks after the edit have moved.
+        self.scan_from = min(self.scan_from, first)
+        gone = old - current
+        if gone:
+            self.engine.trie.remove(gone)
+        current.subtract(old)
+        arrived = +current
+        if arrived:
+            self.engine.trie.add(arrived)
+
+    def scan_block(self, block):
+        text = block.text()
+        match = IMPORT.match(text)
+        if match:
+            for name in (match.group(1) or match.group(2)).split(","):
+                self.engine.introspect(name.strip())
+        return words_of(text)
+
+    def scan(self, deadline):
+        # Scans blocks left as None, then drops the words they replaced,
+        # until the deadline; True when both are done.
+        return self.scan_blocks(deadline) and self.drop_words(deadline)
+
+    def scan_blocks(self, deadline):
+        # The time is checked after every scanned block, and the words found
+        # reach the trie, where new words cost far more than in scan_block,
+        # TRIE_BATCH at a time in between. Runs of blocks scanned already are
+        # skipped without walking them.
+        blocks = self.blocks
+        number = self.scan_from
+        found = Counter()
+        while time.perf_counter() <= deadline:
+            try:
+                number = blocks.index(None, number)
+            except ValueError:
+                number = len(blocks)
+                break
+            block = self.document.findBlockByNumber(number)
+            while number < len(blocks) and blocks[number] is None:
+                words = blocks[number] = self.scan_block(block)
+                found.update(words)
+                if len(found) >= TRIE_BATCH:
+                    self.engine.trie.add(found)
+                    found = Counter()
+                number += 1
+                block = block.next()
+                if time.perf_counter() > deadline:
+                    break
+        self.scan_from = number
+        if found:
+            self.engine.trie.add(found)
+        return number == len(blocks)
+
+    def drop_words(self, deadline):
+        # Scanned first, the new words have been added already: words that
+        # stay only see their count change. The replaced blocks are counted
+        # TRIE_BATCH blocks at a time, then their words leave the trie.
+        replaced = self.replaced
+        dropped = self.dropped
+        while replaced:
+            batch = replaced[-TRIE_BATCH:]
+            del replaced[-TRIE_BATCH:]
+            dropped.update(chain.from_iterable(words for words in batch if words is not None))
+            if time.perf_counter() > deadline:
+                return False
+        while dropped:
+            batch = dict(islice(dropped.items(), TRIE_BATCH))
+            for word in batch:
+                del dropped[word]
+            self.engine.trie.remove(batch)
+            if time.perf_counter() > deadline:
+                return not dropped
+        return True
+
+    def release(self):
+        self.document.contentsChange.disconnect(self.contents_changed)
+        total = Counter(chain.from_iterable(words for words in self.blocks if words is not None))
+        total.update(chain.from_iterable(words for words in self.replaced if words is not None))
+        total.update(self.dropped)
+        self.replaced = []
+        self.dropped = Counter()
+        self.blocks = []
+        self.engine.unscanned.discard(self)
+        if total:
+            self.engine.trie.remove(total)
+
+class CompletionEngine(QObject):
+    # The trie shared by every editor, fed by their BufferWords and by an
+    # Introspector thread for the names no buffer spells out. Between
+    # events, a zero timer scans what large edits left unscanned, then fills
+    # the caches of the trie, so that keystrokes pay for neither.
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.trie = PrefixTrie()
+        self.unscanned = set()
+        self.introspected = set()
+        self.introspector = Introspector(self)
+        self.introspector.found.connect(self.add_static)
+        self.introspector.request("builtins")
+        self.timer = QTimer(self)
+        self.timer.setInterval(0)
+        self.timer.timeout.connect(self.run_slice)
+
+    def attach(self, document):
+        return BufferWords(self, document)
+
+    def introspect(self, module):
+        # Standard library modules only: anything else could run code of
+        # the project, and is indexed with it.
+        if module not in self.introspected and module in sys.stdlib_module_names and module not in UNSAFE_MODULES:
+            self.introspected.add(module)
+            self.introspector.request("module", module)
+
+    def add_static(self, names):
+        self.trie.add_static(names)
+        self.timer.start()
+
+    def schedule_scan(self, words):
+        self.unscanned.add(words)
+        self.timer.start()
+
+    @timed("completion index")
+    def run_slice(self):
+        deadline = time.perf_counter() + SLICE_BUDGET
+        while self.unscanned:
+            words = next(iter(self.unscanned))
+            if not words.scan(deadline):
+                return
+            self.unscanned.discard(words)
+        if self.trie.warm_up(deadline):
+            self.timer.stop()
+
+    def add_project(self, db_path):
+        self.introspector.request("project", db_path)
+
+    def complete(self, prefix):
+        return self.trie.complete(prefix)
+
+    def chosen(self, word):
+        self.trie.chosen(word)
+
+    def shutdown(self):
+        self.timer.stop()
+        self.introspector.shutdown()
+
+def module_names(name):
+    import importlib
+    try:
+        module = importlib.import_module(name)
+    except Exception:
+        return [name]
+    return [name] + [attribute for attribute in dir(module) if not attribute.startswith("_")]
+
+def builtin_names():
+    import builtins
+    import keyword
+    return keyword.kwlist + dir(builtins) + sorted(sys.stdlib_module_names)
+
+def project_names(db_path):
+    import sqlite3
+    connection = sqlite3.connect(db_path)
+    try:
+        return [name for name, in connection.execute(
+            "SELECT DISTINCT name FROM symbols WHERE kind IN ('def', 'class', 'variable')")]
+    except sqlite3.Error:
+        return []
+    finally:
+        connection.close()
+
+class Introspector(QThread):
+    # Gathers names by importing modules or reading the project's symbol
+    # index, off the GUI thread; requests are served in order.
+    found = pyqtSignal(list)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pending = []
+        self.condition = threading.Condition()
+        self.stopping = False
+
+    def request(self, kind, argument=None):
+        with self.condition:
+            self.pending.append((kind, argument))
+            self.condition.notify()
+        if not self.isRunning() and not self.stopping:
+            self.start()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.stopping:
+                    self.condition.wait()
+                if self.stopping:
+                    return
+                kind, argument = self.pending.pop(0)
+            if kind == "builtins":
+                names = builtin_names()
+            elif kind == "module":
+                names = module_names(argument)
+            else:
+                names = project_names(argument)
+            if names:
+                self.found.emit(names)
+
+    def shutdown(self):
+        with self.condition:
+            self.stopping = True
+            self.condition.notify()
+        self.wait()
@@ -0,0 +1,29 @@
+import os
+
+def canonical_path(chemin):
+    # One key per file, however it was reached: relative, through a
+    # symlink, or with a different case on case-insensitive systems.
+    return os.path.normcase(os.path.realpath(chemin))
+
+class DocumentRegistry:
+    # Open files by canonical path. Each tab widget carries its canonical
+    # path as `chemin`, a handle that stays valid when other tabs are closed
+    # or moved, so finding the tab of a file is a dict lookup.
+    def __init__(self):
+        self.widgets = {}
+
+    def get(self, chemin):
+        return self.widgets.get(canonical_path(chemin))
+
+    def add(self, widget):
+        self.widgets[widget.chemin] = widget
+
+    def remove(self, widget):
+        if self.widgets.get(widget.chemin) is widget:
+            del self.widgets[widget.chemin]
+
+    def __contains__(self, chemin):
+        return canonical_path(chemin) in self.widgets
+
+    def __len__(self):
+        return len(self.widgets)
@@ -0,0 +1,224 @@
+import re
+from itertools import accumulate
+
+from PyQt6.QtGui import QTextCursor
+
+# Commands of the command bar that edit lines, vi style:
+#
+#     :dd  :5dd              delete the current line, or 5 lines from it
+#     :d  :10,200d  :%d      delete a range of lines
+#     :s/old/new/  :%s/old/new/gi
+#                            substitute, on the current line by default;
+#                            g: every match of a line, i: ignore case
+#     :g/pat/d  :v/pat/d     delete the lines that match, or do not match,
+#                            in the whole file by default
+#
+# A range is "%" or one or two addresses separated by ",". An address is a
+# line number, "." (current line) or "$" (last line), optionally followed
+# by +N or -N. Patterns are Python regular expressions and replacements use
+# Python's syntax (\1, \g<name>). Any punctuation can stand for "/".
+
+ADDRESS = r"(?:\d+|[.$])(?:[+-]\d+)?"
+RANGE = rf"(?P<range>%|{ADDRESS}(?:,{ADDRESS})?)?"
+
+COUNTED_DELETE = re.compile(r":(?P<count>\d*)dd")
+DELETE = re.compile(rf":{RANGE}d")
+SUBSTITUTE = re.compile(rf":{RANGE}s(?P<rest>[^\w\s\\].*)")
+GLOBAL = re.compile(rf":{RANGE}(?P<command>g!?|v)(?P<rest>[^\w\s\\].*)")
+
+# Ranges longer than this are read from the document's text in one go.
+BULK_READ_LINES = 1000
+
+class EditCommand:
+    # action is "delete", "substitute" or "delete_matching"; first and last
+    # are 0-based, inclusive line numbers.
+    def __init__(self, action, first, last, pattern=None, replacement=None, count=0, invert=False):
+        self.action = action
+        self.first = first
+        self.last = last
+        self.pattern = pattern
+        self.replacement = replacement
+        self.count = count
+        self.invert = invert
+
+def parse_edit_command(command, current_line, line_count):
+    # The EditCommand for command, None if it is not an edit command.
+    # Raises ValueError (or re.error) when it is one but is malformed.
+    match = COUNTED_DELETE.fullmatch(command)
+    if match:
+        count = int(match.group("count") or 1)
+        if count == 0:
+            raise ValueError("Nombre de lignes invalide")
+        return EditCommand("delete", current_line, min(current_line + count, line_count) - 1)
+
+    match = DELETE.fullmatch(command)
+    if match:
+        first, last = resolve_range(match.group("range"), current_line, line_count, (current_line, current_line))
+        return EditCommand("delete", first, last)
+
+    match = SUBSTITUTE.fullmatch(command)
+    if match:
+        parts = split_delimited(match.group("rest"))
+        if len(parts) not in (2, 3):
+            raise ValueError("Syntaxe : :s/motif/remplacement/[gi]")
+        pattern, replacement = parts[0], parts[1]
+        flags = parts[2] if len(parts) == 3 else ""
+        if set(flags) - set("gi"):
+            raise ValueError(f"Option inconnue : {flags}")
+        first, last = resolve_range(match.group("range"), current_line, line_count, (current_line, current_line))
+        compiled = re.compile(pattern, re.IGNORECASE if "i" in flags else 0)
+        return EditCommand("substitute", first, last, compiled, replacement, 0 if "g" in flags else 1)
+
+    match = GLOBAL.fullmatch(command)
+    if match:
+        parts = split_delimited(match.group("rest"))
+        if len(parts) != 2 or parts[1] != "d":
+            raise ValueError("Syntaxe : :g/motif/d")
+        first, last = resolve_range(match.group("range"), current_line, line_count, (0, line_count - 1))
+        return EditCommand("delete_matching", first, last, re.compile(parts[0]),
+                           invert=match.group("command") != "g")
+    return None
+
+def split_delimited(text):
+    # "/a\/b/c/g" -> ["a/b", "c", "g"]: the first character is the
+    # delimiter, and a backslash before it makes it literal.
+    delimiter = text[0]
+    parts = [[]]
+    i = 1
+    while i < len(text):
+        if text[i] == "\\" and text[i + 1:i + 2] == delimiter:
+            parts[-1].append(delimiter)
+            i += 2
+            continue
+        if text[i] == delimiter:
+            parts.append([])
+        else:
+            parts[-1].append(text[i])
+        i += 1
+    return ["".join(part) for part in parts]
+
+def resolve_address(address, current_line, line_count):
+    match = re.fullmatch(r"(\d+|[.$])([+-]\d+)?", address)
+    base, offset = match.groups()
+    if base == ".":
+        line = current_line
+    elif base == "$":
+        line = line_count - 1
+    else:
+        line = int(base) - 1
+    return line + int(offset or 0)
+
+def resolve_range(spec, current_line, line_count, default):
+    if spec is None:
+        return default
+    if spec == "%":
+        return 0, line_count - 1
+    addresses = spec.split(",")
+    first = resolve_address(addresses[0], current_line, line_count)
+    last = resolve_address(addresses[-1], current_line, line_count)
+    if first > last:
+        first, last = last, first
+    if first < 0 or last >= line_count:
+        raise ValueError(f"Plage invalide : {spec}")
+    return first, last
+
+def line_texts(document, first, last):
+    if last - first > BULK_READ_LINES:
+        # One copy of the whole text beats a Python call per block. The raw
+        # text separates blocks with U+2029 and, unlike toPlainText(), keeps
+        # every other character as block.text() returns it.
+        return document.toRawText().split("\u2029")[first:last + 1]
+    lines = []
+    block = document.findBlockByNumber(first)
+    for _ in range(last - first + 1):
+        lines.append(block.text())
+        block = block.next()
+    return lines
+
+def utf16_length(text):
+    # Document positions count UTF-16 code units.
+    return len(text) if text.isascii() else len(text.encode("utf-16-le")) // 2
+
+def delete_lines(document, first, last):
+    # Whole lines go, with one of the line breaks around them.
+    start = document.findBlockByNumber(first).position()
+    end_block = document.findBlockByNumber(last)
+    end = end_block.position() + end_block.length()
+    if not end_block.next().isValid():
+        end -= 1
+        start = max(0, start - 1)
+    cursor = QTextCursor(document)
+    cursor.setPosition(start)
+    cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+    cursor.beginEditBlock()
+    cursor.removeSelectedText()
+    cursor.endEditBlock()
+
+def edit_lines(document, first, old, new):
+    # Line first + i of the document, whose text is old[i], becomes new[i],
+    # or is deleted if new[i] is None. Only the lines that change are
+    # touched, so the blocks of the others, with their highlighting, stay
+    # as they are. All edits go in one edit block: one undo step, and one
+    # change notification spanning them, however many lines are touched.
+    if "".join(old).isascii():
+        lengths = list(map(len, old))
+    else:
+        lengths = list(map(utf16_length, old))
+    # Where each line starts before the edits; shift is what the edits
+    # before it have added.
+    start_of = document.findBlockByNumber(first).position()
+    starts = list(accumulate((length + 1 for length in lengths), initial=start_of))
+    changed = [i for i, (line, new_line) in enumerate(zip(old, new)) if new_line != line]
+    last_line = document.blockCount() - 1
+    shift = 0
+    cursor = QTextCursor(document)
+    cursor.beginEditBlock()
+    k = 0
+    while k < len(changed):
+        i = changed[k]
+        if new[i] is None:
+            # A run of deleted lines goes at once, with its line breaks.
+            j = i
+            while k < len(changed) and changed[k] == j and new[j] is None:
+                j += 1
+                k += 1
+            start = starts[i] + shift
+            end = starts[j] + shift
+            if first + j - 1 == last_line:
+                # The last line has no break after it: the one before goes.
+                end -= 1
+                start = max(0, start - 1)
+            cursor.setPosition(start)
+            cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+            cursor.removeSelectedText()
+            shift -= end - start
+            continue
+        start = starts[i] + shift
+        cursor.setPosition(start)
+        cursor.setPosition(start + lengths[i], QTextCursor.MoveMode.KeepAnchor)
+        cursor.insertText(new[i])
+        shift += utf16_length(new[i]) - lengths[i]
+        k += 1
+    cursor.endEditBlock()
+
+def apply_edit_command(document, edit):
+    # Runs edit on document; returns (lines removed, lines changed).
+    if edit.action == "delete":
+        delete_lines(document, edit.first, edit.last)
+        return edit.last - edit.first + 1, 0
+
+    lines = line_texts(document, edit.first, edit.last)
+    if edit.action == "substitute":
+        new_lines = []
+        changed = 0
+        for line in lines:
+            new_line, count = edit.pattern.subn(edit.replacement, line, count=edit.count)
+            new_lines.append(new_line)
+            changed += bool(count)
+        edit_lines(document, edit.first, lines, new_lines)
+        return 0, changed
+
+    search = edit.pattern.search
+    new_lines = [line if (search(line) is None) != edit.invert else None for line in lines]
+    edit_lines(document, edit.first, lines, new_lines)
+    return new_lines.count(None), 0
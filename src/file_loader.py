@@ -0,0 +1,79 @@
+import codecs
+import os
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+CHUNK_SIZE = 256 * 1024
+
+BOMS = [
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+def sniff_encoding(head):
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding
+    for encoding in ('utf-8', 'cp1252'):
+        try:
+            # The chunk may end in the middle of a character, so decode it
+            # the way the loader will: incrementally, without a final flush.
+            codecs.getincrementaldecoder(encoding)().decode(head, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return 'latin-1'
+
+def sniff_newline(text):
+    if '\r\n' in text:
+        return '\r\n'
+    if '\r' in text:
+        return '\r'
+    return '\n'
+
+class FileLoader(QThread):
+    # Reads a file in chunks off the GUI thread and hands decoded text, with
+    # line endings normalised to '\n', back to the editor as it goes.
+    chunk_loaded = pyqtSignal(str)
+    progress = pyqtSignal(int)
+    loaded = pyqtSignal(str, str)
+    failed = pyqtSignal(str)
+
+    def __init__(self, chemin, parent=None):
+        super().__init__(parent)
+        self.chemin = chemin
+
+    def run(self):
+        try:
+            size = os.path.getsize(self.chemin) or 1
+            with open(self.chemin, 'rb') as f:
+                data = f.read(CHUNK_SIZE)
+                encoding = sniff_encoding(data)
+                decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+                newline = None
+                read = 0
+                pending_cr = ''
+                while data:
+                    if self.isInterruptionRequested():
+                        return
+                    read += len(data)
+                    text = pending_cr + decoder.decode(data)
+                    if newline is None and any(c in text for c in '\r\n'):
+                        newline = sniff_newline(text)
+                    # A '\r' at the end of a chunk may be the first half of
+                    # a '\r\n' split across chunks.
+                    pending_cr = '\r' if text.endswith('\r') else ''
+                    if pending_cr:
+                        text = text[:-1]
+                    self.chunk_loaded.emit(text.replace('\r\n', '\n').replace('\r', '\n'))
+                    self.progress.emit(min(100, read * 100 // size))
+                    data = f.read(CHUNK_SIZE)
+                tail = pending_cr + decoder.decode(b'', final=True)
+                if tail:
+                    self.chunk_loaded.emit(tail.replace('\r\n', '\n').replace('\r', '\n'))
+            self.loaded.emit(encoding, newline or os.linesep)
+        except OSError as e:
+            self.failed.emit(str(e))
@@ -0,0 +1,205 @@
+import os
+import threading
+from collections import deque
+
+from PyQt6.QtCore import Qt, QThread, QTimer, pyqtSignal
+from PyQt6.QtGui import QStandardItem, QStandardItemModel
+from PyQt6.QtWidgets import QFileIconProvider
+
+from project_files import IGNORE_PATTERNS, is_ignored
+
+# Listings reach the tree this many rows at a time, one batch per event-loop
+# turn, so a folder with 100k entries fills in without freezing the view.
+LISTING_BATCH = 1000
+
+PATH_ROLE = Qt.ItemDataRole.UserRole
+SORT_ROLE = Qt.ItemDataRole.UserRole + 1
+
+NOT_LOADED, LOADING, LOADING_MORE, LOADED = range(4)
+
+class DirectoryLister(QThread):
+    # Lists directories one at a time on this thread, folders first and by
+    # name, leaving out ignored entries.
+    listed = pyqtSignal(str, list, bool)
+
+    def __init__(self, patterns=IGNORE_PATTERNS, parent=None):
+        super().__init__(parent)
+        self.patterns = patterns
+        self.pending = []
+        self.condition = threading.Condition()
+        self.stopping = False
+
+    def list_directory(self, path):
+        with self.condition:
+            if path not in self.pending:
+                self.pending.append(path)
+                self.condition.notify()
+        if not self.isRunning():
+            self.start()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.stopping:
+                    self.condition.wait()
+                if self.stopping:
+                    return
+                path = self.pending.pop(0)
+            entries = []
+            try:
+                with os.scandir(path) as it:
+                    for entry in it:
+                        if is_ignored(entry.name, self.patterns):
+                            continue
+                        try:
+                            is_dir = entry.is_dir()
+                        except OSError:
+                            is_dir = False
+                        entries.append((not is_dir, entry.name.lower(), entry.name, is_dir))
+            except OSError:
+                pass
+            entries.sort()
+            rows = [(name, is_dir) for _, _, name, is_dir in entries]
+            start = 0
+            while True:
+                batch = rows[start:start + LISTING_BATCH]
+                start += LISTING_BATCH
+                self.listed.emit(path, batch, start >= len(rows))
+                if start >= len(rows):
+                    break
+
+    def shutdown(self):
+        with self.condition:
+            self.stopping = True
+            self.condition.notify()
+        self.wait()
+
+class ProjectTreeModel(QStandardItemModel):
+    # Lazy tree of one folder: a directory is listed, on the DirectoryLister
+    # thread, when it is first expanded, and listed again on refresh().
+    # Nothing is watched here; whoever watches the folder calls refresh().
+    # Items are not editable; the view is expected to refuse edits.
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setSortRole(SORT_ROLE)
+        icons = QFileIconProvider()
+        self.folder_icon = icons.icon(QFileIconProvider.IconType.Folder)
+        self.file_icon = icons.icon(QFileIconProvider.IconType.File)
+        self.root_path = ""
+        self.items = {}
+        self.states = {}
+        self.refreshing = {}
+        self.lister = DirectoryLister(parent=self)
+        self.lister.listed.connect(self.queue_listing)
+        # Batches all arrive at once; a zero timer applies them one at a
+        # time, letting paint and input events in between.
+        self.listings = deque()
+        self.listing_timer = QTimer(self)
+        self.listing_timer.setInterval(0)
+        self.listing_timer.timeout.connect(self.apply_next_listing)
+
+    def set_root_path(self, path):
+        self.clear()
+        self.root_path = path
+        self.items = {path: self.invisibleRootItem()}
+        self.states = {path: LOADING}
+        self.refreshing = {}
+        self.listings.clear()
+        self.lister.list_directory(path)
+
+    def file_path(self, index):
+        if not index.isValid():
+            return self.root_path
+        return self.itemFromIndex(index).data(PATH_ROLE)
+
+    def canFetchMore(self, parent):
+        return self.states.get(self.file_path(parent)) == NOT_LOADED
+
+    def fetchMore(self, parent):
+        path = self.file_path(parent)
+        if self.states.get(path) == NOT_LOADED:
+            self.states[path] = LOADING
+            self.lister.list_directory(path)
+
+    def make_item(self, prefix, name, is_dir):
+        item = QStandardItem(self.folder_icon if is_dir else self.file_icon, name)
+        path = prefix + name
+        item.setData(path, PATH_ROLE)
+        item.setData(("0" if is_dir else "1") + name.lower(), SORT_ROLE)
+        if is_dir:
+            # Until it is listed, a folder holds a placeholder row so that
+            # the view shows it as expandable.
+            placeholder = QStandardItem("…")
+            placeholder.setFlags(Qt.ItemFlag.NoItemFlags)
+            placeholder.setData(path, PATH_ROLE)
+            item.appendRow(placeholder)
+            self.items[path] = item
+            self.states[path] = NOT_LOADED
+        return item
+
+    def queue_listing(self, path, rows, done):
+        self.listings.append((path, rows, done))
+        if not self.listing_timer.isActive():
+            self.listing_timer.start()
+
+    def apply_next_listing(self):
+        if self.listings:
+            self.add_listing(*self.listings.popleft())
+        if not self.listings:
+            self.listing_timer.stop()
+
+    def add_listing(self, path, rows, done):
+        parent = self.items.get(path)
+        if parent is None:
+            # Listed for a root or folder that is gone from the tree.
+            return
+        if path in self.refreshing:
+            self.refreshing[path].extend(rows)
+            if done:
+                self.reconcile(path, self.refreshing.pop(path))
+            return
+        if path != self.root_path and self.states.get(path) == LOADING:
+            parent.removeRow(0)
+            self.states[path] = LOADED if done else LOADING_MORE
+        elif done:
+            self.states[path] = LOADED
+        if rows:
+            prefix = os.path.join(path, "")
+            parent.appendRows([self.make_item(prefix, name, is_dir) for name, is_dir in rows])
+
+    def reconcile(self, path, rows):
+        # Updates a listed folder in place, so expanded subfolders stay
+        # expanded.
+        parent = self.items[path]
+        wanted = dict(rows)
+        for row in reversed(range(parent.rowCount())):
+            child = parent.child(row)
+            name = child.text()
+            if wanted.get(name) == (child.data(PATH_ROLE) in self.items):
+                del wanted[name]
+            else:
+                self.forget(child.data(PATH_ROLE))
+                parent.removeRow(row)
+        if wanted:
+            prefix = os.path.join(path, "")
+            parent.appendRows([self.make_item(prefix, name, is_dir) for name, is_dir in wanted.items()])
+            parent.sortChildren(0)
+
+    def forget(self, path):
+        prefix = os.path.join(path, "")
+        for known in [known for known in self.items if known == path or known.startswith(prefix)]:
+            del self.items[known]
+            self.states.pop(known, None)
+            self.refreshing.pop(known, None)
+
+    def refresh(self, path=None):
+        # Lists a folder again, or every listed folder when path is None.
+        targets = [path] if path is not None else [known for known, state in self.states.items() if state == LOADED]
+        for target in targets:
+            if self.states.get(target) == LOADED and target not in self.refreshing:
+                self.refreshing[target] = []
+                self.lister.list_directory(target)
+
+    def shutdown(self):
+        self.lister.shutdown()
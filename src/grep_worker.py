@@ -0,0 +1,94 @@
+import mmap
+import os
+import re
+
+# Kept free of Qt: it is what the search processes import. The pool
+# machinery is only imported by the first search.
+
+# Files larger than this are memory-mapped instead of read, so a multi-GB
+# file never becomes a Python bytes object.
+MMAP_THRESHOLD = 4 * 1024 * 1024
+# A NUL byte in the first block marks a file as binary.
+BINARY_SNIFF_SIZE = 8192
+NEWLINE_CHUNK_SIZE = 1024 * 1024
+MAX_LINE_LENGTH = 300
+MAX_FILE_HITS = 1000
+
+_pool = None
+
+def search_pool():
+    # One pool for the whole session: spawning the interpreters costs more
+    # than most searches.
+    global _pool
+    if _pool is None:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        _pool = ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+def shutdown_search_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+def compile_pattern(pattern):
+    return re.compile(pattern.encode("utf-8"), re.MULTILINE)
+
+def count_newlines(data, start, end):
+    # Sliced a chunk at a time: a slice of a mmap is a copy.
+    count = 0
+    while start < end:
+        stop = min(end, start + NEWLINE_CHUNK_SIZE)
+        count += data[start:stop].count(b"\n")
+        start = stop
+    return count
+
+def search_data(data, pattern):
+    # (line, col, text) for each line with a match, one hit per line.
+    hits = []
+    size = len(data)
+    line = 1
+    counted = 0
+    position = 0
+    while len(hits) < MAX_FILE_HITS and position <= size:
+        match = pattern.search(data, position)
+        if match is None:
+            break
+        start = match.start()
+        line += count_newlines(data, counted, start)
+        counted = start
+        line_start = data.rfind(b"\n", 0, start) + 1
+        line_end = data.find(b"\n", start)
+        if line_end == -1:
+            line_end = size
+        if start - line_start > MAX_LINE_LENGTH:
+            col = start - line_start + 1
+            text = data[start:min(line_end, start + MAX_LINE_LENGTH)]
+        else:
+            col = len(data[line_start:start].decode("utf-8", errors="replace")) + 1
+            text = data[line_start:min(line_end, line_start + MAX_LINE_LENGTH)]
+        hits.append((line, col, text.decode("utf-8", errors="replace").rstrip("\r")))
+        position = line_end + 1
+    return hits
+
+def search_file(path, pattern):
+    try:
+        size = os.path.getsize(path)
+        if size == 0:
+            return []
+        with open(path, 'rb') as f:
+            head = f.read(BINARY_SNIFF_SIZE)
+            if b"\0" in head:
+                return []
+            if size <= MMAP_THRESHOLD:
+                return search_data(head + f.read(), pattern)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return search_data(data, pattern)
+    except (OSError, ValueError):
+        return []
+
+def search_files(paths, pattern):
+    # Runs in a search process: [(path, line, col, text), ...] for a batch.
+    compiled = compile_pattern(pattern)
+    return [(path, *hit) for path in paths for hit in search_file(path, compiled)]
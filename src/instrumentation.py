@@ -0,0 +1,162 @@
+import bisect
+import functools
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+
+from PyQt6.QtCore import QObject, QTimer
+
+# Upper bounds of the histogram buckets, in milliseconds; a last bucket holds
+# everything slower.
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+# The event loop is stalled when the heartbeat timer has not fired for this
+# long; while it is, the GUI thread's stack is sampled every SAMPLE_INTERVAL.
+STALL_THRESHOLD = 0.05
+HEARTBEAT_MS = 20
+SAMPLE_INTERVAL = 0.01
+STACK_DEPTH = 12
+MAX_STACKS = 200
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, ms):
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, fraction):
+        # Upper bound of the bucket the percentile falls in, capped at the
+        # slowest sample seen.
+        target = fraction * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS_MS + (self.max,), self.counts):
+            seen += count
+            if seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        labels = [f"<={bound}" for bound in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}"]
+        return {
+            "count": self.count,
+            "total_ms": round(self.total, 3),
+            "mean_ms": round(self.total / self.count, 3) if self.count else 0,
+            "p50_ms": self.percentile(0.5),
+            "p90_ms": self.percentile(0.9),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.max, 3),
+            "buckets_ms": {label: count for label, count in zip(labels, self.counts) if count},
+        }
+
+histograms = {}
+
+def record(name, seconds):
+    histogram = histograms.get(name)
+    if histogram is None:
+        histogram = histograms[name] = Histogram()
+    histogram.record(seconds * 1000)
+
+def timed(name):
+    # Decorator feeding the call's duration to the histogram called name.
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+class StallWatchdog(QObject):
+    # A timer on the GUI thread marks each turn of the event loop; a plain
+    # thread notices when the marks stop and samples what the GUI thread is
+    # running. Stall durations go to the "event loop stall" histogram.
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.gui_thread = threading.get_ident()
+        self.last_beat = time.perf_counter()
+        self.stalls = 0
+        self.samples = Counter()
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(HEARTBEAT_MS)
+        self.timer.timeout.connect(self.beat)
+        self.timer.start()
+        self.thread = threading.Thread(target=self.watch, daemon=True)
+        self.thread.start()
+
+    def beat(self):
+        now = time.perf_counter()
+        gap = now - self.last_beat
+        self.last_beat = now
+        if gap > STALL_THRESHOLD:
+            self.stalls += 1
+            record("event loop stall", gap)
+
+    def watch(self):
+        while not self.stopping.wait(SAMPLE_INTERVAL):
+            if time.perf_counter() - self.last_beat <= STALL_THRESHOLD:
+                continue
+            frame = sys._current_frames().get(self.gui_thread)
+            if frame is None:
+                continue
+            stack = tuple(
+                f"{os.path.basename(entry.filename)}:{entry.lineno} {entry.name}"
+                for entry in traceback.extract_stack(frame, limit=STACK_DEPTH)
+            )
+            del frame
+            with self.lock:
+                if stack in self.samples or len(self.samples) < MAX_STACKS:
+                    self.samples[stack] += 1
+
+    def stop(self):
+        self.timer.stop()
+        self.stopping.set()
+        self.thread.join()
+
+    def summary(self, limit=10):
+        with self.lock:
+            common = self.samples.most_common(limit)
+            total = sum(self.samples.values())
+        return {
+            "stalls": self.stalls,
+            "samples": total,
+            "stacks": [{"samples": count, "stack": list(stack)} for stack, count in common],
+        }
+
+def snapshot(watchdog=None):
+    stats = {"histograms": {name: histogram.summary() for name, histogram in sorted(histograms.items())}}
+    if watchdog is not None:
+        stats["event_loop"] = watchdog.summary()
+    return stats
+
+def format_stats(stats):
+    lines = [f"{'mesure':<22} {'appels':>8} {'moy. ms':>9} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>9}"]
+    for name, summary in stats["histograms"].items():
+        lines.append(
+            f"{name:<22} {summary['count']:>8} {summary['mean_ms']:>9.2f} {summary['p50_ms']:>8.2f}"
+            f" {summary['p90_ms']:>8.2f} {summary['p99_ms']:>8.2f} {summary['max_ms']:>9.1f}"
+        )
+    event_loop = stats.get("event_loop")
+    if event_loop is not None:
+        lines.append("")
+        lines.append(f"Blocages de la boucle d'événements (> {STALL_THRESHOLD * 1000:.0f} ms) : {event_loop['stalls']}")
+        for entry in event_loop["stacks"][:3]:
+            lines.append(f"  {entry['samples']} échantillon(s) :")
+            lines.extend(f"    {frame}" for frame in entry["stack"][-6:])
+    return lines
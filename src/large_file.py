@@ -0,0 +1,148 @@
+import mmap
+import re
+import threading
+from array import array
+
+from PyQt6.QtCore import Qt, QEvent, QTimer
+from PyQt6.QtGui import QTextCursor
+from PyQt6.QtWidgets import QWidget, QHBoxLayout, QPlainTextEdit, QScrollBar, QAbstractSlider
+
+LARGE_FILE_THRESHOLD = 20 * 1024 * 1024
+INDEX_CHUNK_SIZE = 4 * 1024 * 1024
+MAX_LINE_BYTES = 64 * 1024
+WINDOW_MARGIN = 100
+
+NEWLINE = re.compile(b"\n")
+
+class LineIndex:
+    # Byte offset of the start of every line, filled in by a background
+    # thread; lines already indexed can be read while the rest is scanned.
+    def __init__(self, data):
+        self.data = data
+        self.offsets = array('q', [0])
+        self.lock = threading.Lock()
+        self.stop = threading.Event()
+        self.done = False
+        self.thread = threading.Thread(target=self.build, daemon=True)
+        self.thread.start()
+
+    def build(self):
+        size = len(self.data)
+        for start in range(0, size, INDEX_CHUNK_SIZE):
+            if self.stop.is_set():
+                return
+            chunk = self.data[start:start + INDEX_CHUNK_SIZE]
+            found = array('q', (match.end() + start for match in NEWLINE.finditer(chunk)))
+            with self.lock:
+                self.offsets.extend(found)
+        self.done = True
+
+    def line_count(self):
+        with self.lock:
+            return len(self.offsets)
+
+    def read_lines(self, first, count):
+        with self.lock:
+            last = min(first + count, len(self.offsets))
+            bounds = self.offsets[first:last + 1].tolist()
+        if len(bounds) == last - first and self.done:
+            bounds.append(len(self.data))
+        lines = []
+        for start, end in zip(bounds, bounds[1:]):
+            line = self.data[start:min(end, start + MAX_LINE_BYTES)]
+            lines.append(line.rstrip(b"\r\n").decode("utf-8", errors="replace"))
+        return lines
+
+    def close(self):
+        self.stop.set()
+        self.thread.join()
+
+class LargeFileView(QWidget):
+    # Read-only view for files above LARGE_FILE_THRESHOLD: the file is
+    # memory-mapped and only the lines around the viewport are ever decoded
+    # into the text widget, with no highlighting or linting attached.
+    def __init__(self, chemin, parent=None):
+        super().__init__(parent)
+        self.chemin = chemin
+        self.file = open(chemin, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.index = LineIndex(self.data)
+        self.window_start = 0
+        self.window_lines = 0
+
+        layout = QHBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(0)
+
+        self.text = QPlainTextEdit()
+        self.text.setReadOnly(True)
+        self.text.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+        self.text.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.text.setStyleSheet("background-color: #1e1e1e; color: #dcdcdc; font-family: Consolas; font-size: 14px; border-radius: 6px; padding: 4px;")
+        self.text.viewport().installEventFilter(self)
+        self.text.installEventFilter(self)
+        layout.addWidget(self.text)
+
+        self.scroll_bar = QScrollBar(Qt.Orientation.Vertical)
+        self.scroll_bar.valueChanged.connect(self.show_window)
+        layout.addWidget(self.scroll_bar)
+        self.setLayout(layout)
+
+        self.index_timer = QTimer(self)
+        self.index_timer.setInterval(100)
+        self.index_timer.timeout.connect(self.update_line_count)
+        self.index_timer.start()
+        self.update_line_count()
+
+    def visible_line_count(self):
+        return max(1, self.text.viewport().height() // max(1, self.text.fontMetrics().height()))
+
+    def update_line_count(self):
+        self.scroll_bar.setPageStep(self.visible_line_count())
+        self.scroll_bar.setMaximum(max(0, self.index.line_count() - 1))
+        if self.index.done:
+            self.index_timer.stop()
+        if self.window_lines < self.visible_line_count() + WINDOW_MARGIN:
+            self.show_window(self.scroll_bar.value())
+
+    def show_window(self, first):
+        if not (self.window_start <= first and first + self.visible_line_count() <= self.window_start + self.window_lines):
+            self.window_start = max(0, first - WINDOW_MARGIN)
+            lines = self.index.read_lines(self.window_start, first - self.window_start + self.visible_line_count() + WINDOW_MARGIN)
+            self.window_lines = len(lines)
+            self.text.setPlainText("\n".join(lines))
+        self.text.verticalScrollBar().setValue(first - self.window_start)
+
+    def goto_line(self, line_number):
+        if not 0 < line_number <= self.index.line_count():
+            return False
+        target = line_number - 1
+        self.scroll_bar.setValue(max(0, target - self.visible_line_count() // 2))
+        cursor = QTextCursor(self.text.document().findBlockByNumber(target - self.window_start))
+        self.text.setTextCursor(cursor)
+        return True
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Wheel:
+            self.scroll_bar.event(event)
+            return True
+        if event.type() == QEvent.Type.Resize:
+            QTimer.singleShot(0, self.update_line_count)
+        if event.type() == QEvent.Type.KeyPress:
+            actions = {
+                Qt.Key.Key_Up: QAbstractSlider.SliderAction.SliderSingleStepSub,
+                Qt.Key.Key_Down: QAbstractSlider.SliderAction.SliderSingleStepAdd,
+                Qt.Key.Key_PageUp: QAbstractSlider.SliderAction.SliderPageStepSub,
+                Qt.Key.Key_PageDown: QAbstractSlider.SliderAction.SliderPageStepAdd,
+            }
+            action = actions.get(event.key())
+            if action is not None:
+                self.scroll_bar.triggerAction(action)
+                return True
+        return super().eventFilter(obj, event)
+
+    def release(self):
+        self.index_timer.stop()
+        self.index.close()
+        self.data.close()
+        self.file.close()
@@ -0,0 +1,422 @@
+import re
+import time
+
+from PyQt6.QtCore import QObject, QTimer
+from PyQt6.QtGui import QColor, QTextCharFormat, QTextLayout, QSyntaxHighlighter
+
+from instrumentation import timed
+
+# Files above this size get no highlighter at all: colouring them costs more
+# than it is worth. Larger files still open in LargeFileView.
+MAX_HIGHLIGHT_SIZE = 4 * 1024 * 1024
+# From this size on, files are coloured by LazyHighlighter: the blocks on
+# screen first, then the rest in slices of SLICE_BUDGET seconds per turn of
+# the event loop.
+LAZY_HIGHLIGHT_SIZE = 256 * 1024
+SLICE_BUDGET = 0.005
+VIEWPORT_MARGIN = 20
+# Edits spanning more blocks than this are remembered as one range of dirty
+# blocks rather than by flagging each of them.
+DIRTY_RANGE_BLOCKS = 1000
+
+# Colour and weight of each style a grammar can use.
+THEME = {
+    'keyword': ("#569CD6", 75),  # 75 = QFont.Bold
+    'tag': ("#569CD6", None),
+    'string': ("#CE9178", None),
+    'comment': ("#6A9955", None),
+    'number': ("#B5CEA8", None),
+    'attribute': ("#9CDCFE", None),
+}
+
+PYTHON_KEYWORDS = [
+    'def', 'class', 'if', 'elif', 'else', 'while', 'for', 'try', 'except', 'finally',
+    'with', 'as', 'return', 'import', 'from', 'pass', 'break', 'continue', 'in', 'not', 'and', 'or', 'is', 'lambda'
+]
+
+STRING_PREFIX = r"(?:(?<!\w)[rRbBuUfF]{1,2})?"
+
+# A grammar is plain data. "tokens" are tried as one combined pattern, so each
+# line is scanned once, left to right, and whichever token starts first wins:
+# '#' inside a string or a keyword inside a comment is never recoloured. The
+# token patterns must not contain capturing groups. A token listed in
+# "regions" opens a region that runs, across lines if need be, up to the
+# match of an end pattern, picked by how the opening text ends. "styles"
+# gives each token a THEME style.
+GRAMMARS = {
+    'python': {
+        'extensions': ('.py', '.pyw', '.pyi'),
+        'tokens': [
+            ('comment', r"\#.*"),
+            ('triple', STRING_PREFIX + r"""(?:'{3}|"{3})"""),
+            ('string', STRING_PREFIX + r"""(?:"(?:[^"\\]|\\.)*"?|'(?:[^'\\]|\\.)*'?)"""),
+            ('keyword', r"\b(?:" + "|".join(PYTHON_KEYWORDS) + r")\b"),
+        ],
+        'regions': {
+            'triple': {
+                "'''": r"(?<!\\)(?:\\\\)*'''",
+                '"""': r'(?<!\\)(?:\\\\)*"""',
+            },
+        },
+        'styles': {
+            'comment': 'comment',
+            'triple': 'string',
+            'string': 'string',
+            'keyword': 'keyword',
+        },
+    },
+    'html': {
+        'extensions': ('.html', '.htm', '.xml', '.svg'),
+        'tokens': [
+            ('comment', r"<!--"),
+            ('tag', r"</?[A-Za-z][\w:.-]*|/?>"),
+            ('attribute', r"[\w:.-]+(?=\s*=)"),
+            ('string', r""""[^"]*"?|'[^']*'?"""),
+            ('entity', r"&(?:\w+|\#\d+|\#x[0-9A-Fa-f]+);"),
+        ],
+        'regions': {
+            'comment': {"<!--": r"-->"},
+        },
+        'styles': {
+            'comment': 'comment',
+            'tag': 'tag',
+            'attribute': 'attribute',
+            'string': 'string',
+            'entity': 'number',
+        },
+    },
+    'json': {
+        'extensions': ('.json',),
+        'tokens': [
+            ('key', r'"(?:[^"\\]|\\.)*"(?=\s*:)'),
+            ('string', r'"(?:[^"\\]|\\.)*"?'),
+            ('number', r"-?\b\d+(?:\.\d+)?(?:[eE][+-]?\d+)?\b"),
+            ('keyword', r"\b(?:true|false|null)\b"),
+        ],
+        'regions': {},
+        'styles': {
+            'key': 'attribute',
+            'string': 'string',
+            'number': 'number',
+            'keyword': 'keyword',
+        },
+    },
+    'yaml': {
+        'extensions': ('.yml', '.yaml'),
+        'tokens': [
+            ('comment', r"(?:^|(?<=\s))\#.*"),
+            ('key', r"^\s*(?:-\s+)?[\w.-]+(?=\s*:(?:\s|$))"),
+            ('string', r""""(?:[^"\\]|\\.)*"?|'[^']*'?"""),
+            ('keyword', r"\b(?:true|false|null|yes|no|on|off)\b"),
+            ('number', r"-?\b\d+(?:\.\d+)?\b"),
+        ],
+        'regions': {},
+        'styles': {
+            'comment': 'comment',
+            'key': 'attribute',
+            'string': 'string',
+            'keyword': 'keyword',
+            'number': 'number',
+        },
+    },
+}
+
+EXTENSIONS = {extension: name for name, grammar in GRAMMARS.items() for extension in grammar['extensions']}
+
+# Block states carried between lines with setCurrentBlockState: 0 outside
+# any region, then one state per region of the grammar. LazyHighlighter adds
+# flag bits above STATE_MASK.
+STATE_NORMAL = 0
+STATE_MASK = 0xFFFF
+DIRTY = 1 << 16
+PROVISIONAL = 1 << 17
+
+class CompiledGrammar:
+    def __init__(self, grammar):
+        self.pattern = re.compile("|".join(f"(?P<{name}>{pattern})" for name, pattern in grammar['tokens']))
+        self.formats = {name: make_format(style) for name, style in grammar['styles'].items()}
+        # Token name -> [(opening suffix, state)], and for each state the
+        # pattern closing it and the format of the region.
+        self.region_states = {}
+        self.region_ends = {}
+        self.region_formats = {}
+        state = STATE_NORMAL
+        for name, ends in grammar['regions'].items():
+            self.region_states[name] = []
+            for suffix, end in ends.items():
+                state += 1
+                self.region_states[name].append((suffix, state))
+                self.region_ends[state] = re.compile(end)
+                self.region_formats[state] = self.formats[name]
+
+    def tokenize(self, text, state):
+        # [(start, length, format)] for one line entered in state, and the
+        # state the line leaves.
+        spans = []
+        start = 0
+        if state in self.region_ends:
+            start = self.close_region(text, 0, state, 0, spans)
+            if start == -1:
+                return spans, state
+
+        search = self.pattern.search
+        formats = self.formats
+        region_states = self.region_states
+        while True:
+            match = search(text, start)
+            if match is None:
+                return spans, STATE_NORMAL
+            kind = match.lastgroup
+            begin, end = match.span()
+            if kind in region_states:
+                opening = match.group()
+                state = next(state for suffix, state in region_states[kind] if opening.endswith(suffix))
+                end = self.close_region(text, begin, state, end, spans)
+                if end == -1:
+                    return spans, state
+            else:
+                spans.append((begin, end - begin, formats[kind]))
+            start = end if end > begin else end + 1
+
+    def close_region(self, text, start, state, search_from, spans):
+        match = self.region_ends[state].search(text, search_from)
+        end = len(text) if match is None else match.end()
+        if end > start:
+            spans.append((start, end - start, self.region_formats[state]))
+        return -1 if match is None else end
+
+def make_format(style):
+    color, weight = THEME[style]
+    text_format = QTextCharFormat()
+    text_format.setForeground(QColor(color))
+    if weight is not None:
+        text_format.setFontWeight(weight)
+    return text_format
+
+# Grammars are compiled on first use and shared by every tab.
+_compiled = {}
+
+def compiled_grammar(name):
+    grammar = _compiled.get(name)
+    if grammar is None:
+        grammar = _compiled[name] = CompiledGrammar(GRAMMARS[name])
+    return grammar
+
+def register_grammar(name, grammar):
+    GRAMMARS[name] = grammar
+    _compiled.pop(name, None)
+    for extension in grammar['extensions']:
+        EXTENSIONS[extension] = name
+
+def grammar_for(extension):
+    return EXTENSIONS.get((extension or "").lower())
+
+def create_highlighter(document, extension, size=0):
+    # None for plain text, unknown extensions and files too big to colour.
+    name = grammar_for(extension)
+    if name is None or size > MAX_HIGHLIGHT_SIZE:
+        return None
+    if size >= LAZY_HIGHLIGHT_SIZE:
+        return LazyHighlighter(document, compiled_grammar(name))
+    return GrammarHighlighter(document, compiled_grammar(name))
+
+class GrammarHighlighter(QSyntaxHighlighter):
+    def __init__(self, document, grammar):
+        super().__init__(document)
+        self.grammar = grammar
+
+    @timed("highlightBlock")
+    def highlightBlock(self, text):
+        # Qt only moves on to the next block when the state set here differs
+        # from the one it had before, so an edit costs O(changed blocks).
+        spans, state = self.grammar.tokenize(text, self.previousBlockState())
+        for start, length, text_format in spans:
+            self.setFormat(start, length, text_format)
+        self.setCurrentBlockState(state)
+
+class LazyHighlighter(QObject):
+    # Colours a document without QSyntaxHighlighter, which colours every
+    # inserted block before returning. Here an edit only marks its blocks
+    # DIRTY; a zero timer then colours from the first block needing it, for
+    # SLICE_BUDGET per turn of the event loop, and stops once past the last
+    # edit with the states agreeing again. The editor asks for the blocks on
+    # screen first: those are coloured from the state of the block above,
+    # or a guess if it has none yet, and marked PROVISIONAL until the timer
+    # pass gets to them. Blocks dirty_from to dirty_upto, excluded, count as
+    # DIRTY too.
+    def __init__(self, document, grammar):
+        super().__init__(document)
+        self.text_document = document
+        self.grammar = grammar
+        self.pass_from = 0
+        self.pending_upto = 0
+        self.dirty_from = 0
+        self.dirty_upto = 0
+        self.forced = False
+        self.colouring_visible = False
+        self.block_count = document.blockCount()
+        self.timer = QTimer(self)
+        self.timer.setInterval(0)
+        self.timer.timeout.connect(self.run_slice)
+        document.contentsChange.connect(self.contents_changed)
+        if not document.isEmpty():
+            self.contents_changed(0, 0, document.characterCount())
+
+    def setDocument(self, document):
+        # Only detaching is supported, as when the editor changes language.
+        self.timer.stop()
+        self.text_document.contentsChange.disconnect(self.contents_changed)
+        block = self.text_document.begin()
+        while block.isValid():
+            block.layout().clearFormats()
+            block.setUserState(-1)
+            block = block.next()
+        self.text_document.markContentsDirty(0, self.text_document.characterCount())
+
+    def contents_changed(self, position, removed, added):
+        document = self.text_document
+        first = document.findBlock(position)
+        last = document.findBlock(min(position + added, document.characterCount() - 1))
+        number = first.blockNumber()
+        delta = document.blockCount() - self.block_count
+        self.block_count = document.blockCount()
+        self.shift_dirty_range(number, last.blockNumber(), delta)
+        if last.blockNumber() - number >= DIRTY_RANGE_BLOCKS:
+            if self.dirty_from < self.dirty_upto:
+                self.dirty_from = min(self.dirty_from, number)
+                self.dirty_upto = max(self.dirty_upto, last.blockNumber() + 1)
+            else:
+                self.dirty_from, self.dirty_upto = number, last.blockNumber() + 1
+        else:
+            block = first
+            while block.isValid():
+                state = block.userState()
+                if state != -1:
+                    block.setUserState(state | DIRTY)
+                if block == last:
+                    break
+                block = block.next()
+
+        if number < self.pending_upto:
+            self.pending_upto = max(self.pending_upto + delta, last.blockNumber() + 1)
+        else:
+            self.pending_upto = last.blockNumber() + 1
+        if self.pass_from > number:
+            if self.forced:
+                # The block the pass stopped at still has to be redone.
+                stopped = max(self.pass_from + delta, last.blockNumber() + 1)
+                block = document.findBlockByNumber(stopped)
+                if block.isValid() and block.userState() != -1:
+                    block.setUserState(block.userState() | DIRTY)
+                self.pending_upto = max(self.pending_upto, stopped + 1)
+                self.forced = False
+            self.pass_from = number
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def shift_dirty_range(self, first, last, delta):
+        # The edit replaced blocks first to last - delta with blocks first to
+        # last: the dirty range moves with the blocks after it, and an end
+        # inside the edit moves to its edge.
+        if self.dirty_from >= self.dirty_upto:
+            return
+        old_last = last - delta
+        if self.dirty_from > old_last:
+            self.dirty_from += delta
+        elif self.dirty_from > first:
+            self.dirty_from = first
+        if self.dirty_upto - 1 > old_last:
+            self.dirty_upto += delta
+        elif self.dirty_upto - 1 >= first:
+            self.dirty_upto = last + 1
+
+    def is_dirty(self, state, number):
+        return state == -1 or state & DIRTY or self.dirty_from <= number < self.dirty_upto
+
+    @timed("highlightBlock")
+    def colour(self, block, state):
+        spans, state = self.grammar.tokenize(block.text(), state)
+        layout = block.layout()
+        if spans or layout.formats():
+            ranges = []
+            for start, length, text_format in spans:
+                text_range = QTextLayout.FormatRange()
+                text_range.start = start
+                text_range.length = length
+                text_range.format = text_format
+                ranges.append(text_range)
+            layout.setFormats(ranges)
+            self.text_document.markContentsDirty(block.position(), block.length())
+        return state
+
+    def colour_next(self, block, number):
+        # Colours the block if the pass has to; returns whether the pass is
+        # done with the document.
+        if number >= self.pending_upto and not self.forced:
+            return True
+        old = block.userState()
+        if self.forced or self.is_dirty(old, number) or old & PROVISIONAL:
+            previous = block.previous()
+            incoming = previous.userState() & STATE_MASK if previous.isValid() else STATE_NORMAL
+            state = self.colour(block, incoming)
+            block.setUserState(state)
+            # A provisional state came from a guess: the next block is
+            # checked whatever it is now.
+            self.forced = old == -1 or bool(old & PROVISIONAL) or state != old & STATE_MASK
+        return False
+
+    def run_slice(self):
+        deadline = time.perf_counter() + SLICE_BUDGET
+        number = self.pass_from
+        block = self.text_document.findBlockByNumber(number)
+        done = True
+        while block.isValid():
+            if self.colour_next(block, number):
+                break
+            number += 1
+            block = block.next()
+            if time.perf_counter() >= deadline:
+                done = False
+                break
+        self.pass_from = number
+        # Blocks behind the pass are coloured.
+        self.dirty_from = max(self.dirty_from, number)
+        if self.dirty_from >= self.dirty_upto:
+            self.dirty_from = self.dirty_upto = 0
+        if done:
+            self.pending_upto = number
+            self.forced = False
+            self.timer.stop()
+
+    def colour_visible(self, block, count):
+        # Blocks from block on, count of them plus a margin, that the pass
+        # has not reached yet. Marking blocks dirty makes the view lay them
+        # out and ask again; that nested request is ignored.
+        if self.colouring_visible:
+            return
+        self.colouring_visible = True
+        try:
+            self.colour_blocks(block, count + VIEWPORT_MARGIN)
+        finally:
+            self.colouring_visible = False
+
+    def colour_blocks(self, block, count):
+        if block.blockNumber() < self.pass_from:
+            skip = self.pass_from - block.blockNumber()
+            if skip >= count:
+                return
+            block = self.text_document.findBlockByNumber(self.pass_from)
+            count -= skip
+        number = block.blockNumber()
+        while block.isValid() and count > 0:
+            if self.is_dirty(block.userState(), number):
+                previous = block.previous()
+                incoming = previous.userState() & STATE_MASK if previous.isValid() and previous.userState() != -1 else STATE_NORMAL
+                block.setUserState(self.colour(block, incoming) | PROVISIONAL)
+            block = block.next()
+            number += 1
+            count -= 1
+
+class PythonHighlighter(GrammarHighlighter):
+    def __init__(self, document):
+        super().__init__(document, compiled_grammar('python'))
@@ -0,0 +1,115 @@
+import json
+import os
+import sys
+from itertools import count
+
+from PyQt6.QtCore import QObject, QProcess, QTimer
+
+WORKER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lint_worker.py")
+
+# A job unanswered this long means the worker hangs: it is killed, and a
+# fresh one takes the queued jobs. Cold lints of large files take seconds,
+# so this is far above any real job.
+HUNG_JOB_TIMEOUT_MS = 120 * 1000
+
+_service = None
+
+def lint_service():
+    global _service
+    if _service is None:
+        _service = LintService()
+    return _service
+
+def format_diagnostics(path, diagnostics):
+    return "".join(f"{path}:{line}:{column}: {code} {message}\n" for line, column, code, message in diagnostics)
+
+def shutdown_lint_service():
+    if _service is not None:
+        _service.shutdown()
+
+class LintService(QObject):
+    # Talks to a single long-lived lint_worker.py process shared by every
+    # editor. Only one job is in flight at a time; a newer job from the same
+    # owner replaces its queued one, so stale buffers are never linted. A
+    # cancelled job in flight runs to completion, warming the worker's
+    # caches, and its result is dropped by job id.
+    def __init__(self):
+        super().__init__()
+        self.process = None
+        self.job_ids = count()
+        self.pending = {}
+        self.in_flight = None
+        self.buffer = b""
+        self.hang_timer = QTimer(self)
+        self.hang_timer.setSingleShot(True)
+        self.hang_timer.setInterval(HUNG_JOB_TIMEOUT_MS)
+        self.hang_timer.timeout.connect(self.kill_hung_worker)
+
+    def submit(self, owner, source, callback, ignore=None):
+        self.pending[owner] = (next(self.job_ids), source, ignore, callback)
+        self.send_next()
+
+    def cancel(self, owner):
+        self.pending.pop(owner, None)
+        if self.in_flight is not None and self.in_flight[1] == owner:
+            self.in_flight = (self.in_flight[0], owner, None)
+
+    def kill_hung_worker(self):
+        # Killing the worker drops the job; worker_finished starts the next.
+        if self.in_flight is not None and self.process is not None:
+            self.process.kill()
+
+    def ensure_worker(self):
+        if self.process is not None and self.process.state() != QProcess.ProcessState.NotRunning:
+            return True
+        self.buffer = b""
+        self.process = QProcess(self)
+        self.process.readyReadStandardOutput.connect(self.read_results)
+        self.process.finished.connect(self.worker_finished)
+        self.process.start(sys.executable, [WORKER_PATH])
+        return self.process.waitForStarted(3000)
+
+    def send_next(self):
+        if self.in_flight is not None or not self.pending:
+            return
+        if not self.ensure_worker():
+            self.pending.clear()
+            return
+        owner = next(iter(self.pending))
+        job_id, source, ignore, callback = self.pending.pop(owner)
+        self.in_flight = (job_id, owner, callback)
+        self.hang_timer.start()
+        job = {"id": job_id, "source": source}
+        if ignore is not None:
+            job["ignore"] = list(ignore)
+        self.process.write(json.dumps(job).encode() + b"\n")
+
+    def read_results(self):
+        self.buffer += self.process.readAllStandardOutput().data()
+        while b"\n" in self.buffer:
+            line, self.buffer = self.buffer.split(b"\n", 1)
+            result = json.loads(line)
+            if self.in_flight is None or result["id"] != self.in_flight[0]:
+                continue
+            callback = self.in_flight[2]
+            self.in_flight = None
+            self.hang_timer.stop()
+            if callback is not None:
+                callback([tuple(d) for d in result["diagnostics"]])
+        self.send_next()
+
+    def worker_finished(self):
+        # The worker died (crash or missing pyflakes/pycodestyle): drop the
+        # job it was running and start a fresh one for whatever is queued.
+        self.process.deleteLater()
+        self.process = None
+        self.in_flight = None
+        self.hang_timer.stop()
+        self.send_next()
+
+    def shutdown(self):
+        self.hang_timer.stop()
+        if self.process is not None:
+            self.process.finished.disconnect(self.worker_finished)
+            self.process.closeWriteChannel()
+            self.process.waitForFinished(1000)
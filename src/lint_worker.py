@@ -0,0 +1,241 @@
+import ast
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+from collections import OrderedDict
+
+import pycodestyle
+from pyflakes import checker as pyflakes_checker
+
+DEFAULT_IGNORE = ("E501", "E302", "E305", "E701")
+
+# Same codes flake8 reports for pyflakes messages.
+PYFLAKES_CODES = {
+    'UnusedImport': 'F401', 'ImportShadowedByLoopVar': 'F402', 'ImportStarUsed': 'F403',
+    'LateFutureImport': 'F404', 'ImportStarUsage': 'F405', 'ImportStarNotPermitted': 'F406',
+    'FutureFeatureNotDefined': 'F407', 'PercentFormatInvalidFormat': 'F501',
+    'PercentFormatExpectedMapping': 'F502', 'PercentFormatExpectedSequence': 'F503',
+    'PercentFormatExtraNamedArguments': 'F504', 'PercentFormatMissingArgument': 'F505',
+    'PercentFormatMixedPositionalAndNamed': 'F506', 'PercentFormatPositionalCountMismatch': 'F507',
+    'PercentFormatStarRequiresSequence': 'F508', 'PercentFormatUnsupportedFormatCharacter': 'F509',
+    'StringDotFormatInvalidFormat': 'F521', 'StringDotFormatExtraNamedArguments': 'F522',
+    'StringDotFormatExtraPositionalArguments': 'F523', 'StringDotFormatMissingArgument': 'F524',
+    'StringDotFormatMixingAutomatic': 'F525', 'FStringMissingPlaceholders': 'F541',
+    'MultiValueRepeatedKeyLiteral': 'F601', 'MultiValueRepeatedKeyVariable': 'F602',
+    'TooManyExpressionsInStarredAssignment': 'F621', 'TwoStarredExpressions': 'F622',
+    'AssertTuple': 'F631', 'IsLiteral': 'F632', 'InvalidPrintSyntax': 'F633', 'IfTuple': 'F634',
+    'BreakOutsideLoop': 'F701', 'ContinueOutsideLoop': 'F702', 'YieldOutsideFunction': 'F704',
+    'ReturnOutsideFunction': 'F706', 'DefaultExceptNotLast': 'F707', 'DoctestSyntaxError': 'F721',
+    'ForwardAnnotationSyntaxError': 'F722', 'RedefinedWhileUnused': 'F811', 'UndefinedName': 'F821',
+    'UndefinedExport': 'F822', 'UndefinedLocal': 'F823', 'DuplicateArgument': 'F831',
+    'UnusedVariable': 'F841', 'UnusedAnnotation': 'F842', 'RaiseNotImplemented': 'F901',
+}
+
+NOQA_PATTERN = re.compile(r"#\s*noqa(?::\s*(?P<codes>[A-Z][0-9]+(?:[,\s]+[A-Z][0-9]+)*))?", re.IGNORECASE)
+
+# Regions after the first are checked behind a stand-in top-level statement so
+# pycodestyle still applies its blank-line rules to their first definition.
+REGION_PREFIX = ["pass\n"]
+
+# pycodestyle reports these on the last lines of whatever it is given, so they
+# only hold for the region that really ends the file.
+END_OF_FILE_CODES = ("W391", "W292")
+
+# Column-0 lines that may start a top-level def or class; the source is
+# parsed in stretches split before them.
+TOP_LEVEL_DEF = re.compile(r"(?:async\s+def\s|def\s|class\s|@)")
+
+# Added to the worker's nice value, so that it runs when the editor is idle.
+WORKER_NICENESS = 10
+
+RESULT_CACHE_SIZE = 64
+REGION_CACHE_SIZE = 4096
+TREE_CACHE_SIZE = 1024
+
+_style_guides = {}
+_results = OrderedDict()
+_region_results = OrderedDict()
+_region_trees = OrderedDict()
+
+class CollectingReport(pycodestyle.BaseReport):
+    def __init__(self, options):
+        super().__init__(options)
+        self.diagnostics = []
+
+    def error(self, line_number, offset, text, check):
+        code = super().error(line_number, offset, text, check)
+        if code:
+            self.diagnostics.append((line_number, offset + 1, code, text[5:]))
+        return code
+
+def disabled_rules(source):
+    rules = set()
+    for line in source.splitlines():
+        if line.startswith("# lint disable"):
+            parts = line.strip().split()
+            if len(parts) > 2:
+                rules.update(parts[2:])
+    return rules
+
+def style_guide(ignore):
+    guide = _style_guides.get(ignore)
+    if guide is None:
+        # With an empty ignore list pycodestyle would fall back to its own
+        # defaults; select everything instead, as flake8 does.
+        if ignore:
+            guide = pycodestyle.StyleGuide(quiet=True, ignore=list(ignore))
+        else:
+            guide = pycodestyle.StyleGuide(quiet=True, select=("E", "W"))
+        _style_guides[ignore] = guide
+    return guide
+
+def cache_get(cache, key):
+    value = cache.get(key)
+    if value is not None:
+        cache.move_to_end(key)
+    return value
+
+def cache_put(cache, key, value, limit):
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > limit:
+        cache.popitem(last=False)
+
+def digest(text):
+    return hashlib.blake2b(text.encode("utf-8", errors="surrogatepass"), digest_size=16).digest()
+
+def parse_by_region(lines):
+    # The module's tree, joined from the trees of its stretches of top-level
+    # code; unchanged stretches reuse their tree, moved to their new line if
+    # lines were added or removed above them. A stretch that does not parse
+    # on its own, split inside a string say, is joined to the next one; None
+    # if the last one still does not parse.
+    starts = [i for i in range(1, len(lines))
+              if TOP_LEVEL_DEF.match(lines[i]) and not lines[i - 1].startswith("@")] + [len(lines)]
+    body = []
+    used = set()
+    start = 0
+    for end in starts:
+        text = "".join(lines[start:end])
+        key = digest(text)
+        cached = cache_get(_region_trees, key)
+        if cached is None or key in used:
+            # A stretch repeated in the same file gets a tree of its own.
+            try:
+                statements = ast.parse(text).body
+            except SyntaxError:
+                if end == len(lines):
+                    return None
+                continue
+            for node in statements:
+                ast.increment_lineno(node, start)
+            cached = [statements, start]
+            if key not in used:
+                cache_put(_region_trees, key, cached, TREE_CACHE_SIZE)
+        elif cached[1] != start:
+            for node in cached[0]:
+                ast.increment_lineno(node, start - cached[1])
+            cached[1] = start
+        used.add(key)
+        body.extend(cached[0])
+        start = end
+    return ast.Module(body=body, type_ignores=[])
+
+def run_pyflakes(tree):
+    diagnostics = []
+    for message in pyflakes_checker.Checker(tree, filename="stdin").messages:
+        code = PYFLAKES_CODES.get(type(message).__name__, "F999")
+        diagnostics.append((message.lineno, message.col + 1, code, message.message % message.message_args))
+    return diagnostics
+
+def run_pycodestyle(lines, ignore):
+    options = style_guide(ignore).options
+    report = CollectingReport(options)
+    pycodestyle.Checker(filename="stdin", lines=lines, options=options, report=report).check_all()
+    return report.diagnostics
+
+def region_starts(tree, lines):
+    # A region is one top-level def/class (with its decorators and the blank
+    # lines and column-0 comments before it) plus any top-level statements up
+    # to the next one.
+    starts = [0]
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            start = min([node.lineno] + [d.lineno for d in node.decorator_list]) - 1
+            while start > starts[-1] and (not lines[start - 1].strip() or lines[start - 1].startswith("#")):
+                start -= 1
+            if start > starts[-1]:
+                starts.append(start)
+    return starts
+
+def run_pycodestyle_by_region(tree, lines, ignore):
+    # Regions whose text is unchanged reuse their cached diagnostics, shifted
+    # to where the region now starts, so an edit inside one function only
+    # re-checks that function.
+    diagnostics = []
+    starts = region_starts(tree, lines)
+    for start, end in zip(starts, starts[1:] + [len(lines)]):
+        region = lines[start:end]
+        key = (digest("".join(region)), start == 0, ignore)
+        found = cache_get(_region_results, key)
+        if found is None:
+            if start == 0:
+                found = run_pycodestyle(region, ignore)
+            else:
+                found = [(line - len(REGION_PREFIX), column, code, message)
+                         for line, column, code, message in run_pycodestyle(REGION_PREFIX + region, ignore)
+                         if line > len(REGION_PREFIX)]
+            cache_put(_region_results, key, found, REGION_CACHE_SIZE)
+        for line, column, code, message in found:
+            if end != len(lines) and code in END_OF_FILE_CODES:
+                continue
+            diagnostics.append((line + start, column, code, message))
+    return diagnostics
+
+def is_suppressed(diagnostic, lines):
+    lineno, _, code, _ = diagnostic
+    if not 0 < lineno <= len(lines):
+        return False
+    match = NOQA_PATTERN.search(lines[lineno - 1])
+    if match is None:
+        return False
+    codes = match.group("codes")
+    return codes is None or code in re.split(r"[,\s]+", codes)
+
+def lint_source(source, ignore=DEFAULT_IGNORE):
+    key = (digest(source), tuple(ignore))
+    diagnostics = cache_get(_results, key)
+    if diagnostics is not None:
+        return diagnostics
+
+    ignore = tuple(sorted(set(ignore) | disabled_rules(source)))
+    lines = io.StringIO(source, newline="").readlines()
+    try:
+        tree = parse_by_region(lines) or ast.parse(source)
+    except SyntaxError as e:
+        found = [(e.lineno or 1, e.offset or 1, "E999", f"SyntaxError: {e.msg}")] + run_pycodestyle(lines, ignore)
+    else:
+        found = run_pyflakes(tree) + run_pycodestyle_by_region(tree, lines, ignore)
+    diagnostics = sorted(d for d in found if not d[2].startswith(ignore) and not is_suppressed(d, lines))
+    cache_put(_results, key, diagnostics, RESULT_CACHE_SIZE)
+    return diagnostics
+
+def main():
+    # One JSON job per line on stdin, one JSON result per line on stdout.
+    # Linting a large file takes seconds of CPU, which the editor needs more.
+    if hasattr(os, "nice"):
+        os.nice(WORKER_NICENESS)
+    for raw in sys.stdin.buffer:
+        job = json.loads(raw)
+        try:
+            diagnostics = lint_source(job["source"], tuple(job.get("ignore", DEFAULT_IGNORE)))
+        except Exception as e:
+            diagnostics = [(1, 1, "E902", f"{type(e).__name__}: {e}")]
+        sys.stdout.buffer.write(json.dumps({"id": job["id"], "diagnostics": diagnostics}).encode() + b"\n")
+        sys.stdout.buffer.flush()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+import heapq
+import os
+import re
+import time
+from array import array
+from bisect import bisect_right
+from itertools import compress, islice
+
+# Kept free of Qt so that it can be built on a worker thread and timed on
+# its own.
+
+MAX_RESULTS = 50
+# Matching stops after this many matches or once the time budget is spent,
+# and only what was found so far is ranked. The index is ordered shortest
+# file names first, so those are the likeliest hits anyway, and the next
+# keystroke usually narrows the candidates down again.
+MAX_MATCHES = 2000
+MAX_NAME_MATCHES = 500
+SEARCH_BUDGET = 0.005
+MATCH_CHUNK = 1024
+# Removed paths leave a hole in the bitsets; past this many the index is
+# rebuilt.
+MAX_HOLES = 4096
+
+# Bit offsets set in each byte value, to walk the bits of a bitset.
+BYTE_BITS = [tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)]
+NONZERO_BYTES = re.compile(rb"[^\x00]")
+
+def fuzzy_pattern(query):
+    # The characters of the query, in order, anywhere in the path. Each
+    # negated class stops at the next wanted character, so a failed match
+    # never backtracks.
+    return re.compile("".join(f"[^{re.escape(c)}]*{re.escape(c)}" for c in query))
+
+def set_bits(bits):
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+    for match in NONZERO_BYTES.finditer(data):
+        base = match.start() * 8
+        for bit in BYTE_BITS[data[match.start()]]:
+            yield base + bit
+
+def rank(lowered, query):
+    name = lowered[lowered.rfind(os.sep) + 1:]
+    if name.startswith(query):
+        tier = 0
+    elif query in name:
+        tier = 1
+    elif query in lowered:
+        tier = 2
+    else:
+        tier = 3
+    return tier, len(name), len(lowered)
+
+class PathIndex:
+    # The files of a project as paths relative to its root. For every
+    # character, a bitset (a Python int, one bit per path) records which paths
+    # contain it, so a query is narrowed down with a few big-int ANDs before a
+    # single path is looked at; only the survivors are matched and ranked.
+
+    def __init__(self, paths=()):
+        self.paths = []
+        self.lowered = []
+        self.ids = {}
+        self.children = {}
+        self.char_bits = {}
+        self.live = 0
+        # Lowercase file names, one per line, and where each one starts: a
+        # query that is part of a name is found with one substring search.
+        self.names = ""
+        self.name_starts = array('q')
+        self.generation = 0
+        self.last_search = None
+        self.add(sorted(paths, key=lambda path: (len(os.path.basename(path)), len(path))))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, paths):
+        new = [path for path in dict.fromkeys(paths) if path not in self.ids]
+        if not new:
+            return
+        first = len(self.paths)
+        size = (first + len(new) + 7) // 8
+        masks = {}
+        names = []
+        offset = len(self.names)
+        for i, path in enumerate(new, first):
+            lowered = path.lower()
+            self.paths.append(path)
+            self.lowered.append(lowered)
+            self.ids[path] = i
+            self.children.setdefault(os.path.dirname(path), set()).add(path)
+            name = lowered[lowered.rfind(os.sep) + 1:]
+            names.append(name)
+            self.name_starts.append(offset)
+            offset += len(name) + 1
+            byte, bit = i >> 3, 1 << (i & 7)
+            for c in set(lowered):
+                mask = masks.get(c)
+                if mask is None:
+                    mask = masks[c] = bytearray(size)
+                mask[byte] |= bit
+        for c, mask in masks.items():
+            self.char_bits[c] = self.char_bits.get(c, 0) | int.from_bytes(mask, 'little')
+        self.live |= ((1 << len(new)) - 1) << first
+        self.names += "\n".join(names) + "\n"
+        self.generation += 1
+
+    def remove(self, paths):
+        removed = bytearray((len(self.paths) + 7) // 8)
+        for path in paths:
+            i = self.ids.pop(path, None)
+            if i is not None:
+                removed[i >> 3] |= 1 << (i & 7)
+                self.children.get(os.path.dirname(path), set()).discard(path)
+        self.live &= ~int.from_bytes(removed, 'little')
+        self.generation += 1
+        if len(self.paths) - len(self.ids) > MAX_HOLES:
+            self.__init__(self.ids)
+
+    def remove_tree(self, directory):
+        # One remove for the whole tree: past MAX_HOLES it rebuilds the index,
+        # children included.
+        prefix = os.path.join(directory, "") if directory else ""
+        paths = []
+        for parent in [parent for parent in self.children if parent == directory or parent.startswith(prefix)]:
+            paths.extend(self.children.pop(parent))
+        self.remove(paths)
+
+    def files_in(self, directory):
+        return set(self.children.get(directory, ()))
+
+    def search(self, query, limit=MAX_RESULTS):
+        deadline = time.perf_counter() + SEARCH_BUDGET
+        query = "".join(query.lower().split())
+        if not query:
+            return [self.paths[i] for i in islice(set_bits(self.live), limit)]
+
+        # Whole-name hits first, wherever they are in the index.
+        found = set()
+        for match in islice(re.finditer(re.escape(query), self.names), MAX_NAME_MATCHES):
+            i = bisect_right(self.name_starts, match.start()) - 1
+            if self.ids.get(self.paths[i]) == i:
+                found.add(i)
+
+        # Narrowing: while the user keeps typing, only the previous matches
+        # can still match.
+        last = self.last_search
+        if last is not None and last[1] == self.generation and query.startswith(last[0]) and last[3]:
+            candidates = iter(last[2])
+        else:
+            bits = self.live
+            for c in set(query):
+                bits &= self.char_bits.get(c, 0)
+                if not bits:
+                    break
+            candidates = set_bits(bits)
+
+        pattern = fuzzy_pattern(query)
+        matches = []
+        complete = False
+        while len(matches) < MAX_MATCHES and time.perf_counter() < deadline:
+            chunk = list(islice(candidates, MATCH_CHUNK))
+            if not chunk:
+                complete = True
+                break
+            matches.extend(compress(chunk, map(pattern.match, map(self.lowered.__getitem__, chunk))))
+        self.last_search = (query, self.generation, matches, complete)
+        found.update(matches)
+        best = heapq.nsmallest(limit, found, key=lambda i: rank(self.lowered[i], query))
+        return [self.paths[i] for i in best]
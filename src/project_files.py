@@ -0,0 +1,38 @@
+import fnmatch
+import os
+
+# Directory and file names skipped everywhere the editor walks a project.
+IGNORE_PATTERNS = [
+    ".git", ".hg", ".svn", "__pycache__", "node_modules", ".venv", "venv",
+    ".mypy_cache", ".pytest_cache", ".ruff_cache", ".tox", ".nox", "*.egg-info",
+    "*.pyc", "*.pyo",
+]
+
+def is_ignored(name, patterns=IGNORE_PATTERNS):
+    return any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)
+
+def iter_files(root, patterns=IGNORE_PATTERNS, suffixes=None, should_stop=None, on_directory=None):
+    # Yields (path, os.DirEntry) for every file under root, depth first,
+    # without descending into ignored directories or following symlinks.
+    # on_directory, if given, is called with each directory as it is entered.
+    pending = [root]
+    while pending:
+        if should_stop is not None and should_stop():
+            return
+        directory = pending.pop()
+        if on_directory is not None:
+            on_directory(directory)
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if is_ignored(entry.name, patterns):
+                        continue
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        elif entry.is_file() and (suffixes is None or entry.name.endswith(suffixes)):
+                            yield entry.path, entry
+                    except OSError:
+                        continue
+        except OSError:
+            continue
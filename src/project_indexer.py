@@ -0,0 +1,168 @@
+import os
+
+from PyQt6.QtCore import QObject, QThread, QTimer, QFileSystemWatcher, QStandardPaths, pyqtSignal
+
+from path_index import PathIndex
+from project_files import is_ignored, iter_files
+
+# Changes are collected for this long before the affected directories are
+# listed again, so that a checkout or a build touching many files at once
+# costs one pass.
+RESCAN_DELAY_MS = 200
+
+def index_db_path(root):
+    import hashlib
+    dossier = os.path.join(QStandardPaths.writableLocation(QStandardPaths.StandardLocation.CacheLocation), "index")
+    os.makedirs(dossier, exist_ok=True)
+    key = hashlib.sha1(os.path.realpath(root).encode("utf-8", errors="surrogatepass")).hexdigest()
+    return os.path.join(dossier, f"{key}.sqlite")
+
+class ProjectIndexer(QThread):
+    # Brings the on-disk symbol index of a project folder up to date; the
+    # GUI thread queries the same database through its own connection.
+    progress = pyqtSignal(int, int)
+
+    def __init__(self, root, db_path, parent=None):
+        super().__init__(parent)
+        self.root = root
+        self.db_path = db_path
+
+    def run(self):
+        from symbol_index import SymbolIndex
+        index = SymbolIndex(self.db_path)
+        try:
+            index.update(self.root, self.isInterruptionRequested, self.progress.emit)
+        finally:
+            index.close()
+
+class PathScanner(QThread):
+    # Walks directories of a project (given relative to its root, "" for the
+    # root itself) and reports every directory entered and every file found,
+    # relative to the root. The first scan of a project also builds the
+    # PathIndex here, off the GUI thread.
+    scanned = pyqtSignal(list, list)
+
+    def __init__(self, root, directories, build_index=False, parent=None):
+        super().__init__(parent)
+        self.root = root
+        self.directories = directories
+        self.build_index = build_index
+        self.index = None
+
+    def run(self):
+        prefix = len(os.path.join(self.root, ""))
+        directories = []
+        files = []
+        for directory in self.directories:
+            top = os.path.join(self.root, directory) if directory else self.root
+            for path, _ in iter_files(top, should_stop=self.isInterruptionRequested,
+                                      on_directory=lambda path: directories.append(path[prefix:])):
+                files.append(path[prefix:])
+        if self.isInterruptionRequested():
+            return
+        if self.build_index:
+            self.index = PathIndex(files)
+        self.scanned.emit(directories, files)
+
+class PathWatcher(QObject):
+    # Keeps the PathIndex of a project folder current: built once in the
+    # background, then patched one directory at a time from file system
+    # notifications, which are also passed on through directory_changed.
+    ready = pyqtSignal()
+    directory_changed = pyqtSignal(str)
+
+    def __init__(self, root, parent=None):
+        super().__init__(parent)
+        self.root = root
+        self.index = None
+        self.scanners = []
+        self.changed = set()
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self.directory_changed)
+        self.watcher.directoryChanged.connect(self.queue_rescan)
+        self.rescan_timer = QTimer(self)
+        self.rescan_timer.setSingleShot(True)
+        self.rescan_timer.setInterval(RESCAN_DELAY_MS)
+        self.rescan_timer.timeout.connect(self.rescan)
+        self.scan([""], build_index=True)
+
+    def absolute(self, directory):
+        return os.path.join(self.root, directory) if directory else self.root
+
+    def relative(self, path):
+        return "" if path == self.root else path[len(os.path.join(self.root, "")):]
+
+    def scan(self, directories, build_index=False):
+        scanner = PathScanner(self.root, directories, build_index, self)
+        scanner.scanned.connect(self.scanned)
+        scanner.finished.connect(scanner.deleteLater)
+        self.scanners.append(scanner)
+        scanner.start()
+
+    def scanned(self, directories, files):
+        scanner = self.sender()
+        self.scanners.remove(scanner)
+        if scanner.index is not None:
+            self.index = scanner.index
+        elif self.index is not None:
+            self.index.add(files)
+        if directories:
+            self.watcher.addPaths([self.absolute(directory) for directory in directories])
+        if scanner.index is not None:
+            self.ready.emit()
+
+    def queue_rescan(self, path):
+        self.changed.add(path)
+        self.rescan_timer.start()
+
+    def rescan(self):
+        if self.index is None:
+            # The first scan has not finished yet; it will see these changes.
+            self.changed.clear()
+            return
+        watched = set(self.watcher.directories())
+        new_directories = []
+        for path in self.changed:
+            directory = self.relative(path)
+            try:
+                with os.scandir(path) as entries:
+                    entries = [entry for entry in entries if not is_ignored(entry.name)]
+            except OSError:
+                self.forget(directory, watched)
+                continue
+            files = set()
+            subdirectories = set()
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirectories.add(entry.path)
+                        if entry.path not in watched:
+                            new_directories.append(self.relative(entry.path))
+                    elif entry.is_file():
+                        files.add(self.relative(entry.path))
+                except OSError:
+                    continue
+            # A renamed or deleted subdirectory may only be reported here.
+            for child in list(watched):
+                if os.path.dirname(child) == path and child not in subdirectories:
+                    self.forget(self.relative(child), watched)
+            known = self.index.files_in(directory)
+            self.index.remove(known - files)
+            self.index.add(sorted(files - known))
+        self.changed.clear()
+        if new_directories:
+            self.scan(new_directories)
+
+    def forget(self, directory, watched):
+        self.index.remove_tree(directory)
+        path = self.absolute(directory)
+        gone = [other for other in watched if other == path or other.startswith(os.path.join(path, ""))]
+        if gone:
+            self.watcher.removePaths(gone)
+            watched.difference_update(gone)
+
+    def stop(self):
+        self.rescan_timer.stop()
+        for scanner in self.scanners:
+            scanner.requestInterruption()
+            scanner.wait()
@@ -0,0 +1,121 @@
+import os
+
+from PyQt6.QtCore import Qt, QThread, pyqtSignal
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel, QListWidget, QListWidgetItem
+
+from grep_worker import search_files, search_pool
+from project_files import iter_files
+
+# Files are handed to the search processes in batches of at most this many
+# files or bytes; a file above the byte limit goes alone.
+BATCH_FILES = 64
+BATCH_BYTES = 8 * 1024 * 1024
+MAX_HITS = 20000
+POLL_INTERVAL = 0.1
+
+class ProjectSearch(QThread):
+    # Walks a project folder and greps it in the search processes, streaming
+    # each batch's hits back as soon as it is done.
+    found = pyqtSignal(list)
+    completed = pyqtSignal(int, int, bool)
+
+    def __init__(self, root, pattern, parent=None):
+        super().__init__(parent)
+        self.root = root
+        self.pattern = pattern
+        self.pending = set()
+        self.hits = 0
+
+    def run(self):
+        pool = search_pool()
+        max_pending = 4 * (os.cpu_count() or 1)
+        files = 0
+        batch = []
+        batch_bytes = 0
+        for path, entry in iter_files(self.root, should_stop=self.should_stop):
+            try:
+                batch_bytes += entry.stat().st_size
+            except OSError:
+                continue
+            batch.append(path)
+            files += 1
+            if len(batch) >= BATCH_FILES or batch_bytes >= BATCH_BYTES:
+                self.pending.add(pool.submit(search_files, batch, self.pattern))
+                batch = []
+                batch_bytes = 0
+                while len(self.pending) >= max_pending and not self.should_stop():
+                    self.collect()
+        if batch and not self.should_stop():
+            self.pending.add(pool.submit(search_files, batch, self.pattern))
+        while self.pending and not self.should_stop():
+            self.collect()
+        for future in self.pending:
+            future.cancel()
+        if not self.isInterruptionRequested():
+            self.completed.emit(files, self.hits, self.hits >= MAX_HITS)
+
+    def should_stop(self):
+        return self.isInterruptionRequested() or self.hits >= MAX_HITS
+
+    def collect(self):
+        from concurrent.futures import FIRST_COMPLETED, wait
+        done, self.pending = wait(self.pending, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                rows = future.result()
+            except Exception:
+                continue
+            if rows:
+                rows = rows[:MAX_HITS - self.hits]
+                self.hits += len(rows)
+                self.found.emit(rows)
+
+class SearchPanel(QWidget):
+    # Results of :grep, one row per matching line; activating a row emits
+    # result_activated with (path, line).
+    result_activated = pyqtSignal(str, int)
+
+    def __init__(self):
+        super().__init__()
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.header = QLabel()
+        layout.addWidget(self.header)
+
+        self.results = QListWidget()
+        self.results.setUniformItemSizes(True)
+        self.results.itemClicked.connect(self.activate)
+        self.results.itemActivated.connect(self.activate)
+        layout.addWidget(self.results)
+
+        self.setLayout(layout)
+        self.root = ""
+        self.pattern = ""
+
+    def start(self, root, pattern):
+        self.root = root
+        self.pattern = pattern
+        self.results.clear()
+        self.header.setText(f"Recherche de « {pattern} »…")
+        self.show()
+
+    def add_results(self, rows):
+        for path, line, col, text in rows:
+            relative = os.path.relpath(path, self.root)
+            item = QListWidgetItem(f"{relative}:{line}:{col}  {text.strip()}")
+            item.setData(Qt.ItemDataRole.UserRole, (path, line))
+            self.results.addItem(item)
+        self.header.setText(f"Recherche de « {self.pattern} »… {self.results.count()} résultats")
+
+    def finish(self, files, hits, truncated):
+        suffix = " (limite atteinte)" if truncated else ""
+        self.header.setText(f"« {self.pattern} » : {hits} résultats dans {files} fichiers{suffix}")
+
+    def activate(self, item):
+        path, line = item.data(Qt.ItemDataRole.UserRole)
+        # The file may have been deleted or renamed since the search.
+        if not os.path.isfile(path):
+            self.header.setText(f"Fichier introuvable : {os.path.relpath(path, self.root)}")
+            return
+        self.result_activated.emit(path, line)
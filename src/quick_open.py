@@ -0,0 +1,66 @@
+import os
+
+from PyQt6.QtCore import Qt, QEvent, pyqtSignal
+from PyQt6.QtWidgets import QDialog, QVBoxLayout, QLineEdit, QListWidget, QListWidgetItem
+
+class QuickOpen(QDialog):
+    # Popup listing the files of the open folder that fuzzy-match what is
+    # typed, best first. Emits file_chosen with the absolute path.
+    file_chosen = pyqtSignal(str)
+
+    def __init__(self, path_watcher, parent=None, query=""):
+        super().__init__(parent, Qt.WindowType.Popup)
+        self.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        self.path_watcher = path_watcher
+        self.resize(600, 400)
+        self.setStyleSheet("background-color: #252526; color: #dcdcdc;")
+        layout = QVBoxLayout()
+
+        self.input = QLineEdit()
+        self.input.setPlaceholderText("Rechercher un fichier")
+        self.input.setStyleSheet("border: none; padding: 5px; border-radius: 5px; background-color: #3c3c3c;")
+        self.input.textChanged.connect(self.update_results)
+        self.input.returnPressed.connect(self.open_current)
+        self.input.installEventFilter(self)
+        layout.addWidget(self.input)
+
+        self.results = QListWidget()
+        self.results.setStyleSheet("border: none;")
+        self.results.itemActivated.connect(self.open_current)
+        layout.addWidget(self.results)
+
+        self.setLayout(layout)
+        path_watcher.ready.connect(self.update_results)
+        self.input.setText(query)
+        self.update_results()
+
+    def update_results(self):
+        self.results.clear()
+        index = self.path_watcher.index
+        if index is None:
+            item = QListWidgetItem("Indexation du dossier en cours…")
+            item.setFlags(Qt.ItemFlag.NoItemFlags)
+            self.results.addItem(item)
+            return
+        for path in index.search(self.input.text()):
+            item = QListWidgetItem(f"{os.path.basename(path)}    {os.path.dirname(path)}")
+            item.setData(Qt.ItemDataRole.UserRole, os.path.join(self.path_watcher.root, path))
+            self.results.addItem(item)
+        self.results.setCurrentRow(0)
+
+    def open_current(self):
+        item = self.results.currentItem()
+        chemin = item.data(Qt.ItemDataRole.UserRole) if item is not None else None
+        if chemin:
+            self.close()
+            self.file_chosen.emit(chemin)
+
+    def eventFilter(self, obj, event):
+        # Up, Down and page keys move through the results while the focus
+        # stays in the input.
+        if event.type() == QEvent.Type.KeyPress and event.key() in (
+            Qt.Key.Key_Up, Qt.Key.Key_Down, Qt.Key.Key_PageUp, Qt.Key.Key_PageDown
+        ):
+            self.results.keyPressEvent(event)
+            return True
+        return super().eventFilter(obj, event)
@@ -0,0 +1,308 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+from PyQt6.QtCore import QStandardPaths, QThread, pyqtSignal
+from PyQt6.QtGui import QTextCursor, QTextDocument
+
+from file_loader import CHUNK_SIZE, sniff_encoding
+from save_service import write_atomically
+
+# Queued edits are written out, and synced, at most this often.
+FLUSH_INTERVAL = 0.5
+
+# A journal is compacted into a snapshot of the text once it holds more
+# than the document itself, and at least COMPACT_MIN_SIZE: each copy of
+# the document is paid for by as many bytes of edits, so journaling stays
+# proportional to the size of the edits, not of the file.
+COMPACT_MIN_SIZE = 256 * 1024
+COMPACT_CHECK_MS = 30 * 1000
+
+# A journal is a file of JSON lines. The first one says what the edits
+# apply to: the file on disk, as it was when the buffer was loaded or saved
+#     {"path": ..., "size": ..., "mtime_ns": ...}
+# or a snapshot of the text
+#     {"path": ..., "text": ...}
+# and every other one is a contentsChange, in document positions:
+#     [position, characters removed, text added]
+
+# Each running editor keeps its journals in a folder of its own under
+# recovery_dir(), and holds a lock on the LOCK_NAME file in it for as long
+# as it runs. Journals in a folder whose lock can be taken were left by an
+# editor that is gone.
+LOCK_NAME = "owner.lock"
+
+def recovery_dir():
+    dossier = os.path.join(
+        QStandardPaths.writableLocation(QStandardPaths.StandardLocation.AppDataLocation), "recovery")
+    os.makedirs(dossier, exist_ok=True)
+    return dossier
+
+def try_lock(f):
+    # Takes an exclusive lock on the open file f without waiting; False if
+    # another open file holds it, in this process or another.
+    try:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return False
+    return True
+
+def claim_instance_dir():
+    # A new folder for this editor's journals, and its lock file, locked.
+    while True:
+        dossier = tempfile.mkdtemp(prefix="instance-", dir=recovery_dir())
+        lock = open(os.path.join(dossier, LOCK_NAME), 'a')
+        if try_lock(lock):
+            try:
+                # pending_journals may have taken the folder for a dead
+                # one's and removed it before the lock was taken.
+                if os.path.samestat(os.fstat(lock.fileno()), os.stat(lock.name)):
+                    return dossier, lock
+            except OSError:
+                pass
+        lock.close()
+
+def journal_path(dossier, chemin):
+    key = hashlib.sha1(chemin.encode('utf-8', 'surrogateescape')).hexdigest()
+    return os.path.join(dossier, f"{key}.journal")
+
+def file_stat(chemin):
+    # (size, mtime_ns) of chemin, None if it cannot be stat'ed.
+    try:
+        stat = os.stat(chemin)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+def read_text(chemin):
+    # The file decoded and normalised the way FileLoader does it.
+    with open(chemin, 'rb') as f:
+        data = f.read()
+    text = data.decode(sniff_encoding(data[:CHUNK_SIZE]), errors='replace')
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+def list_journals(dossier):
+    # (path, journal) for each journal in dossier, removing unreadable ones.
+    journaux = []
+    for nom in sorted(os.listdir(dossier)):
+        if not nom.endswith(".journal"):
+            continue
+        journal = os.path.join(dossier, nom)
+        try:
+            with open(journal, 'r', encoding='utf-8') as f:
+                journaux.append((json.loads(f.readline())["path"], journal))
+        except (OSError, ValueError, KeyError, TypeError):
+            remove_journal(journal)
+    return journaux
+
+def pending_journals():
+    # (path, journal) for each journal left by an editor that is gone. A
+    # clean exit removes them all, so these are buffers lost in a crash;
+    # the journals of running editors, this one included, are skipped.
+    racine = recovery_dir()
+    # Journals written before they were kept in per-editor folders.
+    journaux = list_journals(racine)
+    for nom in sorted(os.listdir(racine)):
+        dossier = os.path.join(racine, nom)
+        try:
+            lock = open(os.path.join(dossier, LOCK_NAME), 'r+')
+        except OSError:
+            # Not an editor's folder, or one not locked yet.
+            continue
+        with lock:
+            if not try_lock(lock):
+                continue
+            trouves = list_journals(dossier)
+            if not trouves:
+                # Nothing left to recover: the folder goes, while locked so
+                # that claim_instance_dir sees it happen.
+                try:
+                    os.remove(lock.name)
+                    os.rmdir(dossier)
+                except OSError:
+                    pass
+            journaux.extend(trouves)
+    return journaux
+
+def replay_journal(journal):
+    # The text of the buffer as of the journal's last flush, or None if it
+    # cannot be rebuilt, e.g. because the file changed on disk since.
+    try:
+        with open(journal, 'r', encoding='utf-8') as f:
+            header = json.loads(f.readline())
+            if "text" in header:
+                text = header["text"]
+            else:
+                if file_stat(header["path"]) != (header["size"], header["mtime_ns"]):
+                    return None
+                text = read_text(header["path"])
+            # Positions are those of a QTextDocument, so the edits are
+            # replayed on one.
+            document = QTextDocument()
+            document.setUndoRedoEnabled(False)
+            document.setPlainText(text)
+            cursor = QTextCursor(document)
+            for line in f:
+                try:
+                    position, removed, added = json.loads(line)
+                except ValueError:
+                    # The last line may have been cut short by the crash.
+                    break
+                end = document.characterCount() - 1
+                cursor.setPosition(min(position, end))
+                cursor.setPosition(min(position + removed, end), QTextCursor.MoveMode.KeepAnchor)
+                cursor.insertText(added)
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    return document.toRawText().replace('\u2029', '\n')
+
+def remove_journal(journal):
+    try:
+        os.remove(journal)
+    except FileNotFoundError:
+        pass
+
+class RecoveryJournal(QThread):
+    # Keeps an append-only journal of the edits of each buffer with unsaved
+    # changes. The GUI thread only queues them, at a cost proportional to
+    # the edit; this thread writes them out in batches.
+    failed = pyqtSignal(str, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.dossier, self.lock = claim_instance_dir()
+        self.pending = []
+        self.journaled = set()
+        self.files = {}
+        self.broken = set()
+        self.condition = threading.Condition()
+        self.flush_now = threading.Event()
+        self.stopping = False
+
+    def queue(self, action, chemin, data=None):
+        with self.condition:
+            self.pending.append((action, chemin, data))
+            self.condition.notify()
+        if not self.isRunning() and not self.stopping:
+            self.start()
+
+    def record(self, chemin, position, removed, added, disk_stat):
+        # disk_stat is the (size, mtime_ns) of the file as the buffer was
+        # loaded or last saved, taken then by the GUI thread: a new journal
+        # starts from it.
+        if chemin not in self.journaled:
+            self.journaled.add(chemin)
+            self.queue("start", chemin, disk_stat)
+        self.queue("edit", chemin, (position, removed, added))
+
+    def compact(self, chemin, text):
+        # Starts the journal of chemin over from text.
+        self.journaled.add(chemin)
+        self.queue("snapshot", chemin, text)
+
+    def discard(self, chemin):
+        # The buffer matches the file again, or is gone.
+        if chemin in self.journaled:
+            self.journaled.discard(chemin)
+            self.queue("discard", chemin)
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.stopping:
+                    self.condition.wait()
+                if not self.pending:
+                    break
+            # Edits queued while waiting join the same batch.
+            self.flush_now.wait(FLUSH_INTERVAL)
+            with self.condition:
+                batch, self.pending = self.pending, []
+            self.write_batch(batch)
+        # Only a clean exit gets here: nothing is left to recover.
+        for chemin in list(self.files):
+            self.close_journal(chemin)
+            remove_journal(journal_path(self.dossier, chemin))
+        self.release_dir()
+
+    def write_batch(self, batch):
+        written = {}
+        for action, chemin, data in batch:
+            try:
+                if action == "start":
+                    self.broken.discard(chemin)
+                    self.close_journal(chemin)
+                    written.pop(chemin, None)
+                    self.open_journal(chemin, data)
+                elif action == "edit":
+                    if chemin in self.broken:
+                        continue
+                    f = self.files[chemin]
+                    f.write(json.dumps(data) + "\n")
+                    written[chemin] = f
+                elif action == "snapshot":
+                    self.broken.discard(chemin)
+                    self.close_journal(chemin)
+                    written.pop(chemin, None)
+                    journal = journal_path(self.dossier, chemin)
+                    write_atomically(journal, json.dumps({"path": chemin, "text": data}) + "\n", 'utf-8', '\n')
+                    self.files[chemin] = open(journal, 'a', encoding='utf-8', newline='\n')
+                else:
+                    self.broken.discard(chemin)
+                    self.close_journal(chemin)
+                    written.pop(chemin, None)
+                    remove_journal(journal_path(self.dossier, chemin))
+            except OSError as e:
+                # Given up until the next snapshot: later edits would not
+                # replay without the ones lost here.
+                self.broken.add(chemin)
+                self.close_journal(chemin)
+                written.pop(chemin, None)
+                self.failed.emit(chemin, str(e))
+        for chemin, f in written.items():
+            try:
+                f.flush()
+                os.fsync(f.fileno())
+            except OSError as e:
+                self.failed.emit(chemin, str(e))
+
+    def open_journal(self, chemin, disk_stat):
+        size, mtime_ns = disk_stat
+        f = open(journal_path(self.dossier, chemin), 'w', encoding='utf-8', newline='\n')
+        f.write(json.dumps({"path": chemin, "size": size, "mtime_ns": mtime_ns}) + "\n")
+        self.files[chemin] = f
+
+    def close_journal(self, chemin):
+        f = self.files.pop(chemin, None)
+        if f is not None:
+            try:
+                f.close()
+            except OSError:
+                pass
+
+    def shutdown(self):
+        # Writes what is queued, then removes the journals: the editor is
+        # quitting normally.
+        with self.condition:
+            self.stopping = True
+            self.condition.notify()
+        self.flush_now.set()
+        self.wait()
+        if not self.isFinished():
+            # Never started: no journal was written.
+            self.release_dir()
+
+    def release_dir(self):
+        self.lock.close()
+        try:
+            os.remove(self.lock.name)
+            os.rmdir(self.dossier)
+        except OSError:
+            pass
@@ -0,0 +1,82 @@
+import os
+import stat
+import threading
+import time
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+def write_atomically(chemin, text, encoding, newline):
+    # Write next to the target, fsync, then rename over it: a crash leaves
+    # either the old file or the new one, never a truncated mix.
+    import tempfile
+    chemin = os.path.realpath(chemin)
+    dossier = os.path.dirname(chemin)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(chemin)}.", suffix=".tmp", dir=dossier)
+    try:
+        with os.fdopen(fd, 'w', encoding=encoding, newline=newline) as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            mode = stat.S_IMODE(os.stat(chemin).st_mode)
+        except FileNotFoundError:
+            umask = os.umask(0)
+            os.umask(umask)
+            mode = 0o666 & ~umask
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, chemin)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    if os.name != "nt":
+        dir_fd = os.open(dossier, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+class SaveService(QThread):
+    # Saves run one at a time on this thread. A save requested while an
+    # earlier one for the same path is still queued replaces its snapshot,
+    # so rapid repeated saves cost a single write. The revision given with a
+    # snapshot comes back with saved or failed, to tell which one it was.
+    saved = pyqtSignal(str, float, int)
+    failed = pyqtSignal(str, str, int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pending = {}
+        self.condition = threading.Condition()
+        self.stopping = False
+
+    def save(self, chemin, text, encoding, newline, revision):
+        with self.condition:
+            requested_at = self.pending.get(chemin, (None, None, None, None, time.perf_counter()))[4]
+            self.pending[chemin] = (text, encoding, newline, revision, requested_at)
+            self.condition.notify()
+        if not self.isRunning():
+            self.start()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.stopping:
+                    self.condition.wait()
+                if not self.pending:
+                    return
+                chemin = next(iter(self.pending))
+                text, encoding, newline, revision, requested_at = self.pending.pop(chemin)
+            try:
+                write_atomically(chemin, text, encoding, newline)
+            except (OSError, UnicodeError) as e:
+                self.failed.emit(chemin, str(e), revision)
+            else:
+                self.saved.emit(chemin, time.perf_counter() - requested_at, revision)
+
+    def shutdown(self):
+        # Let queued saves finish before the application exits.
+        with self.condition:
+            self.stopping = True
+            self.condition.notify()
+        self.wait()
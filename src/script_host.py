@@ -0,0 +1,95 @@
+import atexit
+import json
+import os
+import pkgutil  # noqa: F401 -- runpy.run_path imports it lazily; keep that out of the profiles
+import runpy
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Runs a script as __main__ on behalf of the editor's :run and :profile
+# commands and, on exit, writes the process's own CPU time and peak RSS to a
+# stats file, plus cProfile hotspots and tracemalloc allocation sites when
+# asked for.
+# Usage: script_host.py [--profile] [--tracemalloc] STATS_PATH SCRIPT [ARGS...]
+
+TOP_ENTRIES = 15
+
+# The script's globals, kept alive until the stats are written so that
+# allocations it still references show up in the tracemalloc snapshot.
+script_globals = None
+
+# Frames belonging to the host itself rather than to the profiled script.
+HOST_FILES = {
+    os.path.abspath(__file__), os.path.abspath(runpy.__file__), os.path.abspath(tracemalloc.__file__),
+    "<frozen runpy>",
+}
+
+def peak_rss_bytes():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def hotspots(profiler):
+    import pstats
+    rows = []
+    for (filename, line, function), (_, ncalls, tottime, cumtime, _) in pstats.Stats(profiler).stats.items():
+        if filename in HOST_FILES or os.path.abspath(filename) in HOST_FILES or function == "<built-in method builtins.exec>":
+            continue
+        rows.append([filename, line, function, ncalls, tottime, cumtime])
+    rows.sort(key=lambda row: row[5], reverse=True)
+    return rows[:TOP_ENTRIES]
+
+def allocation_sites():
+    snapshot = tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.Filter(False, path) for path in HOST_FILES]
+    )
+    return [
+        [stat.traceback[0].filename, stat.traceback[0].lineno, stat.size, stat.count]
+        for stat in snapshot.statistics('lineno')[:TOP_ENTRIES]
+    ]
+
+def write_stats(stats_path, stats, profiler):
+    stats["cpu_time"] = time.process_time()
+    stats["peak_rss"] = peak_rss_bytes()
+    if profiler is not None:
+        profiler.disable()
+        stats["hotspots"] = hotspots(profiler)
+    if tracemalloc.is_tracing():
+        stats["allocations"] = allocation_sites()
+        stats["traced_peak"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    with open(stats_path, 'w', encoding='utf-8') as f:
+        json.dump(stats, f)
+
+def main():
+    global script_globals
+    options = set()
+    while sys.argv[1].startswith("--"):
+        options.add(sys.argv.pop(1))
+    stats_path, script = sys.argv[1], sys.argv[2]
+    sys.argv = sys.argv[2:]
+    sys.path[0] = os.path.dirname(os.path.abspath(script))
+
+    profiler = None
+    if "--profile" in options:
+        import cProfile
+        HOST_FILES.add(os.path.abspath(cProfile.__file__))
+        profiler = cProfile.Profile()
+    if "--tracemalloc" in options:
+        tracemalloc.start()
+    # atexit also runs when the script calls sys.exit() or raises.
+    stats = {}
+    atexit.register(write_stats, stats_path, stats, profiler)
+    if profiler is not None:
+        profiler.enable()
+    script_globals = runpy.run_path(script, run_name="__main__")
+
+if __name__ == '__main__':
+    main()
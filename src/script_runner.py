@@ -0,0 +1,107 @@
+import codecs
+import json
+import os
+import sys
+import time
+
+from PyQt6.QtCore import QObject, QProcess, pyqtSignal
+
+HOST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "script_host.py")
+
+def format_bytes(size):
+    for unit in ("o", "Ko", "Mo", "Go"):
+        if size < 1024 or unit == "Go":
+            return f"{size:.1f} {unit}"
+        size /= 1024
+
+class ScriptRunner(QObject):
+    # Runs one script at a time through script_host.py, streaming its output
+    # as it arrives and reporting wall time, CPU time and peak RSS at exit.
+    # Profiled runs also hand back the host's hotspot and allocation tables.
+    output = pyqtSignal(str)
+    profiled = pyqtSignal(dict)
+    finished = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.process = None
+        self.stats_path = None
+        self.started_at = None
+        self.stopped = False
+        self.stdout_decoder = None
+        self.stderr_decoder = None
+
+    def is_running(self):
+        return self.process is not None
+
+    def start(self, path, profile=False, trace_malloc=False):
+        import tempfile
+        fd, self.stats_path = tempfile.mkstemp(prefix="eraz-run-", suffix=".json")
+        os.close(fd)
+
+        self.stopped = False
+        self.stdout_decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.stderr_decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.process = QProcess(self)
+        self.process.readyReadStandardOutput.connect(self.read_output)
+        self.process.readyReadStandardError.connect(self.read_output)
+        self.process.finished.connect(self.process_finished)
+        self.process.errorOccurred.connect(self.process_error)
+        self.started_at = time.perf_counter()
+        options = []
+        if profile:
+            options.append("--profile")
+        if trace_malloc:
+            options.append("--tracemalloc")
+        self.process.start(sys.executable, ["-u", HOST_PATH] + options + [self.stats_path, path])
+
+    def stop(self):
+        if self.process is not None:
+            self.stopped = True
+            self.process.kill()
+
+    def read_output(self):
+        output = self.stdout_decoder.decode(self.process.readAllStandardOutput().data())
+        error_output = self.stderr_decoder.decode(self.process.readAllStandardError().data())
+        if output:
+            self.output.emit(output)
+        if error_output:
+            self.output.emit(error_output)
+
+    def read_stats(self):
+        try:
+            with open(self.stats_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+        finally:
+            os.remove(self.stats_path)
+
+    def process_finished(self, exit_code, exit_status):
+        self.read_output()
+        wall_time = time.perf_counter() - self.started_at
+        stats = self.read_stats()
+        self.process.deleteLater()
+        self.process = None
+
+        parts = [f"{wall_time:.2f} s réel"]
+        if "cpu_time" in stats:
+            parts.append(f"{stats['cpu_time']:.2f} s CPU")
+        if stats.get("peak_rss"):
+            parts.append(f"{format_bytes(stats['peak_rss'])} RSS max")
+        if "hotspots" in stats or "allocations" in stats:
+            self.profiled.emit(stats)
+        if self.stopped:
+            status = "Arrêté"
+        elif exit_status == QProcess.ExitStatus.CrashExit:
+            status = "Planté"
+        else:
+            status = f"Terminé (code {exit_code})"
+        self.finished.emit(f"[{status}] " + ", ".join(parts))
+
+    def process_error(self, error):
+        if error == QProcess.ProcessError.FailedToStart:
+            self.process.deleteLater()
+            self.process = None
+            self.read_stats()
+            self.finished.emit("[Erreur] Impossible de lancer l'interpréteur Python.")
@@ -0,0 +1,43 @@
+import json
+import os
+
+from PyQt6.QtCore import Qt, QStandardPaths
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel
+
+from save_service import write_atomically
+
+# Tabs left in the background this long are hibernated: their document and
+# highlighter are dropped, and the file is read again when the tab is shown.
+HIBERNATE_AFTER = 10 * 60
+HIBERNATE_CHECK_MS = 60 * 1000
+
+def session_path():
+    dossier = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.AppDataLocation)
+    os.makedirs(dossier, exist_ok=True)
+    return os.path.join(dossier, "session.json")
+
+def load_session():
+    try:
+        with open(session_path(), 'r', encoding='utf-8') as f:
+            session = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return session if isinstance(session, dict) else None
+
+def save_session(session):
+    write_atomically(session_path(), json.dumps(session, indent=1), 'utf-8', '\n')
+
+class TabPlaceholder(QWidget):
+    # Stands in for a tab whose file is not loaded, either restored from the
+    # last session and not shown yet or hibernated. Keeps the cursor position
+    # and scroll offset to put back once the file is loaded.
+    def __init__(self, chemin, cursor=0, scroll=0):
+        super().__init__()
+        self.chemin = chemin
+        self.cursor = cursor
+        self.scroll = scroll
+        layout = QVBoxLayout()
+        self.label = QLabel(f"Chargement de {os.path.basename(chemin)}…")
+        self.label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(self.label)
+        self.setLayout(layout)
@@ -0,0 +1,24 @@
+import sys
+import time
+
+# Start-up phases, printed by --startup-profile. app.py imports this module
+# before anything else, which starts the clock.
+
+STARTED_AT = time.perf_counter()
+FLAG = "--startup-profile"
+
+phases = []
+
+def enabled():
+    return FLAG in sys.argv
+
+def mark(name):
+    phases.append((name, time.perf_counter()))
+
+def report(stream=None):
+    lines = ["Profil de démarrage (ms) :"]
+    previous = STARTED_AT
+    for name, at in phases:
+        lines.append(f"  {name:<26} {(at - previous) * 1000:8.1f} {(at - STARTED_AT) * 1000:9.1f}")
+        previous = at
+    print("\n".join(lines), file=stream or sys.stderr, flush=True)
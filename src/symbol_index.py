@@ -0,0 +1,152 @@
+import ast
+import multiprocessing
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+
+from project_files import iter_files
+
+# Kept free of Qt: the parse workers are spawned processes that import this
+# module, and the GUI side only needs the query methods.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, mtime REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS symbols (name TEXT NOT NULL, kind TEXT NOT NULL, path TEXT NOT NULL, line INTEGER NOT NULL, col INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS symbols_by_name ON symbols (name, kind);
+CREATE INDEX IF NOT EXISTS symbols_by_path ON symbols (path);
+"""
+
+DEFINITION_KINDS = ("def", "class", "variable", "import")
+COMMIT_EVERY = 200
+CHUNK_SIZE = 32
+
+class SymbolCollector(ast.NodeVisitor):
+    def __init__(self):
+        self.rows = []
+        self.seen_refs = set()
+
+    def add(self, name, kind, node):
+        self.rows.append((name, kind, node.lineno, node.col_offset + 1))
+
+    def visit_FunctionDef(self, node):
+        self.add(node.name, "def", node)
+        self.generic_visit(node)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_ClassDef(self, node):
+        self.add(node.name, "class", node)
+        self.generic_visit(node)
+
+    def visit_Import(self, node):
+        for alias in node.names:
+            self.add(alias.asname or alias.name.split(".")[0], "import", node)
+
+    def visit_ImportFrom(self, node):
+        for alias in node.names:
+            if alias.name != "*":
+                self.add(alias.asname or alias.name, "import", node)
+
+    def visit_Name(self, node):
+        self.add_ref(node.id, node)
+
+    def visit_Attribute(self, node):
+        self.add_ref(node.attr, node)
+        self.generic_visit(node)
+
+    def add_ref(self, name, node):
+        # One reference per name per line is enough to jump to it.
+        if (name, node.lineno) not in self.seen_refs:
+            self.seen_refs.add((name, node.lineno))
+            self.add(name, "ref", node)
+
+def module_variables(tree):
+    for node in tree.body:
+        targets = node.targets if isinstance(node, ast.Assign) else [node.target] if isinstance(node, ast.AnnAssign) else []
+        for target in targets:
+            if isinstance(target, ast.Name):
+                yield target.id, "variable", target.lineno, target.col_offset + 1
+
+def parse_file(path):
+    try:
+        with open(path, 'rb') as f:
+            tree = ast.parse(f.read(), filename=path)
+    except (OSError, SyntaxError, ValueError):
+        return path, []
+    collector = SymbolCollector()
+    collector.visit(tree)
+    return path, collector.rows + list(module_variables(tree))
+
+class SymbolIndex:
+    def __init__(self, db_path):
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+
+    def definitions(self, name, limit=200):
+        placeholders = ",".join("?" * len(DEFINITION_KINDS))
+        return self.connection.execute(
+            f"SELECT path, line, col, kind FROM symbols WHERE name = ? AND kind IN ({placeholders}) "
+            f"ORDER BY kind = 'import', path, line LIMIT ?",
+            (name, *DEFINITION_KINDS, limit),
+        ).fetchall()
+
+    def references(self, name, limit=500):
+        return self.connection.execute(
+            "SELECT path, line, col, kind FROM symbols WHERE name = ? AND kind = 'ref' ORDER BY path, line LIMIT ?",
+            (name, limit),
+        ).fetchall()
+
+    def update(self, root, should_stop=lambda: False, progress=lambda done, total: None):
+        # Incremental: only files whose mtime differs from the stored one are
+        # parsed again, in a pool of worker processes. Returns False if
+        # should_stop interrupted it: the index is then only partly updated,
+        # and progress never reports it done.
+        known = dict(self.connection.execute("SELECT path, mtime FROM files"))
+        changed = {}
+        for path, entry in iter_files(root, suffixes=(".py",), should_stop=should_stop):
+            mtime = entry.stat().st_mtime
+            if known.pop(path, None) != mtime:
+                changed[path] = mtime
+        if should_stop():
+            return False
+
+        for path in known:
+            self.remove(path)
+        self.connection.commit()
+        if not changed:
+            progress(0, 0)
+            return True
+
+        # Spawned rather than forked: the indexer runs on a thread of a Qt
+        # process. Small updates do not pay for a whole pool of interpreters.
+        context = multiprocessing.get_context("spawn")
+        workers = max(1, min(os.cpu_count() or 1, len(changed) // CHUNK_SIZE))
+        stopped = False
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            for done, (path, rows) in enumerate(pool.map(parse_file, changed, chunksize=CHUNK_SIZE), 1):
+                if should_stop():
+                    stopped = True
+                    pool.shutdown(cancel_futures=True)
+                    break
+                self.remove(path)
+                self.connection.executemany(
+                    "INSERT INTO symbols (name, kind, path, line, col) VALUES (?, ?, ?, ?, ?)",
+                    [(name, kind, path, line, col) for name, kind, line, col in rows],
+                )
+                self.connection.execute("INSERT INTO files (path, mtime) VALUES (?, ?)", (path, changed[path]))
+                if done % COMMIT_EVERY == 0:
+                    self.connection.commit()
+                    progress(done, len(changed))
+        self.connection.commit()
+        if stopped:
+            return False
+        progress(len(changed), len(changed))
+        return True
+
+    def remove(self, path):
+        self.connection.execute("DELETE FROM symbols WHERE path = ?", (path,))
+        self.connection.execute("DELETE FROM files WHERE path = ?", (path,))
+
+    def close(self):
+        self.connection.close()
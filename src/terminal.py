@@ -1,46 +1,176 @@
+import codecs
 import os
+from collections import deque
 from PyQt6.QtWidgets import QWidget, QVBoxLayout, QPlainTextEdit, QLineEdit
-from PyQt6.QtCore import QProcess
+from PyQt6.QtCore import QProcess, QStandardPaths, QTimer, QEvent, pyqtSignal
+from PyQt6.QtGui import QTextCursor, QTextCharFormat, QColor
+
+from instrumentation import timed
+
+DEFAULT_SCROLLBACK = 10000
+FLUSH_INTERVAL_MS = 33
+
+def terminal_log_path():
+    # The full output of the panel, beyond its scrollback, since it was last
+    # cleared.
+    dossier = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.CacheLocation)
+    os.makedirs(dossier, exist_ok=True)
+    return os.path.join(dossier, "terminal.log")
 
 class TerminalWidget(QWidget):
-    def __init__(self):
+    # Emitted with (path, line) when a row written with write_link is clicked.
+    link_activated = pyqtSignal(str, int)
+
+    def __init__(self, max_scrollback=DEFAULT_SCROLLBACK, spill_path=None):
         super().__init__()
         layout = QVBoxLayout()
 
         self.terminal_output = QPlainTextEdit()
         self.terminal_output.setReadOnly(True)
+        self.terminal_output.setMaximumBlockCount(max_scrollback)
+        self.terminal_output.viewport().installEventFilter(self)
         layout.addWidget(self.terminal_output)
 
         self.input_line = QLineEdit()
         self.input_line.returnPressed.connect(self.execute_command)
+        self.input_line.installEventFilter(self)
         layout.addWidget(self.input_line)
 
         self.setLayout(layout)
 
-        # Start the terminal process
+        # Output is queued here and flushed to the widget at most once per
+        # FLUSH_INTERVAL_MS in a single insert. Only the last max_scrollback
+        # lines are ever kept; the spill file, if any, gets everything.
+        self.max_scrollback = max_scrollback
+        self.pending = deque()
+        self.pending_lines = 0
+        self.at_line_start = True
+        self.spill_file = None
+        if spill_path:
+            self.set_spill_path(spill_path)
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(FLUSH_INTERVAL_MS)
+        self.flush_timer.timeout.connect(self.flush_output)
+
+        # Determine the appropriate encoding based on the operating system
+        encoding = "cp1252" if os.name == "nt" else "utf-8"
+        self.stdout_decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        self.stderr_decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+
+        # The shell is only started when the input line first gets the focus.
+        self.process = None
+
+    def start_shell(self):
+        if self.process is not None:
+            return
         self.process = QProcess()
         shell = "cmd.exe" if os.name == "nt" else "bash"
         self.process.start(shell)
         self.process.readyReadStandardOutput.connect(self.read_output)
         self.process.readyReadStandardError.connect(self.read_output)
-    
+
     def execute_command(self):
         command = self.input_line.text().strip()
         if command:
-            self.terminal_output.appendPlainText(f"> {command}")
+            self.start_shell()
+            self.append_line(f"> {command}")
             self.process.write((command + "\n").encode())
         self.input_line.clear()
-    
-    def read_output(self):
-        # Determine the appropriate encoding based on the operating system
-        encoding = "cp1252" if os.name == "nt" else "utf-8"
 
-        # Read and decode the standard output and error output
-        output = self.process.readAllStandardOutput().data().decode(encoding, errors="replace")
-        error_output = self.process.readAllStandardError().data().decode(encoding, errors="replace")
+    @timed("read_output")
+    def read_output(self):
+        # Read and decode the standard output and error output; the
+        # incremental decoders keep characters split across reads intact.
+        output = self.stdout_decoder.decode(self.process.readAllStandardOutput().data())
+        error_output = self.stderr_decoder.decode(self.process.readAllStandardError().data())
 
-        # Append the output to the terminal
         if output:
-            self.terminal_output.appendPlainText(output)
+            self.write(output)
         if error_output:
-            self.terminal_output.appendPlainText(error_output)
+            self.write(error_output)
+
+    def write(self, text):
+        if self.spill_file is not None:
+            self.spill_file.write(text)
+        self.pending.append(text)
+        self.pending_lines += text.count("\n")
+        self.at_line_start = text.endswith("\n")
+        while len(self.pending) > 1 and self.pending_lines - self.pending[0].count("\n") >= self.max_scrollback:
+            self.pending_lines -= self.pending.popleft().count("\n")
+        if not self.flush_timer.isActive():
+            self.flush_timer.start()
+
+    def append_line(self, text):
+        self.write(("" if self.at_line_start else "\n") + text + "\n")
+
+    def flush_output(self):
+        if not self.pending:
+            return
+        text = "".join(self.pending)
+        if self.pending_lines > self.max_scrollback:
+            cut = len(text)
+            for _ in range(self.max_scrollback + 1):
+                cut = text.rfind("\n", 0, cut)
+                if cut == -1:
+                    break
+            text = text[cut + 1:]
+        self.pending.clear()
+        self.pending_lines = 0
+        if self.spill_file is not None:
+            self.spill_file.flush()
+
+        scroll_bar = self.terminal_output.verticalScrollBar()
+        at_bottom = scroll_bar.value() == scroll_bar.maximum()
+        cursor = QTextCursor(self.terminal_output.document())
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.insertText(text, QTextCharFormat())
+        if at_bottom:
+            scroll_bar.setValue(scroll_bar.maximum())
+
+    def write_link(self, text, path, line):
+        # Links are inserted directly, after whatever output is still queued,
+        # so they stay in order with the surrounding text.
+        self.flush_output()
+        if not self.at_line_start:
+            self.write("\n")
+            self.flush_output()
+        link_format = QTextCharFormat()
+        link_format.setAnchor(True)
+        link_format.setAnchorHref(f"{line}:{path}")
+        link_format.setForeground(QColor("#3794ff"))
+        cursor = QTextCursor(self.terminal_output.document())
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.insertText(text, link_format)
+        cursor.insertText("\n", QTextCharFormat())
+        if self.spill_file is not None:
+            self.spill_file.write(text + "\n")
+
+    def eventFilter(self, obj, event):
+        if obj is self.input_line:
+            if event.type() == QEvent.Type.FocusIn:
+                self.start_shell()
+        elif event.type() == QEvent.Type.MouseButtonRelease:
+            anchor = self.terminal_output.anchorAt(event.position().toPoint())
+            if anchor:
+                line, path = anchor.split(":", 1)
+                self.link_activated.emit(path, int(line))
+                return True
+        return super().eventFilter(obj, event)
+
+    def clear_output(self):
+        self.pending.clear()
+        self.pending_lines = 0
+        self.at_line_start = True
+        self.terminal_output.clear()
+        if self.spill_file is not None:
+            self.spill_file.truncate(0)
+
+    def set_spill_path(self, spill_path):
+        if self.spill_file is not None:
+            self.spill_file.close()
+        self.spill_file = open(spill_path, 'a', encoding='utf-8') if spill_path else None
+
+    def shutdown(self):
+        self.flush_output()
+        self.set_spill_path(None)
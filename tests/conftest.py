@@ -0,0 +1,38 @@
+import os
+import sys
+
+# Headless, and importing the modules of src/ the way app.py does.
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import pytest
+
+@pytest.fixture(scope="session")
+def qapp():
+    from PyQt6.QtWidgets import QApplication
+    from lint_service import shutdown_lint_service
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    yield app
+    shutdown_lint_service()
+
+@pytest.fixture
+def window(qapp, tmp_path, monkeypatch):
+    # A main window whose session, journals and index live under tmp_path,
+    # and whose warnings are collected in window.warnings instead of shown.
+    from PyQt6.QtWidgets import QMessageBox
+    for name in ("XDG_DATA_HOME", "XDG_CACHE_HOME", "XDG_CONFIG_HOME"):
+        monkeypatch.setenv(name, str(tmp_path / name.lower()))
+    warnings = []
+    monkeypatch.setattr(QMessageBox, "warning", staticmethod(lambda parent, title, text, *args: warnings.append(text)))
+    from app import EditeurCode
+    window = EditeurCode()
+    window.warnings = warnings
+    yield window
+    while window.tabs.count():
+        window.fermer_onglet(0)
+    window.journal.shutdown()
+    window.completion.shutdown()
+    window.save_service.shutdown()
+    window.terminal.shutdown()
+    window.deleteLater()
+    qapp.processEvents()
@@ -0,0 +1,152 @@
+from PyQt6.QtCore import Qt
+from PyQt6.QtTest import QTest
+from PyQt6.QtWidgets import QTextEdit
+
+def test_stale_search_result_is_reported(window, tmp_path):
+    gone = tmp_path / "gone.py"
+    gone.write_text("needle = 1\n")
+    window.search_panel.start(str(tmp_path), "needle")
+    window.search_panel.add_results([(str(gone), 1, 1, "needle = 1")])
+    gone.unlink()
+
+    results = window.search_panel.results
+    results.show()
+    QTest.mouseClick(results.viewport(), Qt.MouseButton.LeftButton, pos=results.visualItemRect(results.item(0)).center())
+    assert window.tabs.count() == 0
+    assert window.search_panel.header.text() == "Fichier introuvable : gone.py"
+
+def test_save_with_unloaded_placeholder(window, tmp_path):
+    from session import TabPlaceholder
+    placeholder = TabPlaceholder(str(tmp_path / "deleted.py"))
+    window.tabs.addTab(placeholder, "deleted.py")
+    window.documents.add(placeholder)
+    window.onglet_active(window.tabs.indexOf(placeholder))
+    # The file is gone, so the placeholder stays.
+    assert window.tabs.currentWidget() is placeholder
+
+    window.sauvegarder_fichier()
+    assert window.warnings == ["Onglet non chargé."]
+    assert not (tmp_path / "deleted.py").exists()
+
+def wait_until(qapp, condition, timeout=10):
+    import time
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        qapp.processEvents()
+        time.sleep(0.01)
+
+def test_lint_command_lints_the_buffer(window, qapp, tmp_path):
+    from PyQt6.QtWidgets import QMessageBox
+    # Not UTF-8: cp1252, as FileLoader opens it.
+    source = tmp_path / "accents.py"
+    source.write_bytes("nom = 'café'\n".encode("cp1252"))
+    editor = window.ouvrir_chemin(str(source))
+    wait_until(qapp, lambda: not editor.loading)
+    editor.textCursor().insertText("import os\n")
+
+    window.execute_command(":lint")
+    wait_until(qapp, lambda: window.findChildren(QMessageBox))
+    output = window.findChildren(QMessageBox)[0].findChild(QTextEdit).toPlainText()
+    assert f"{source}:1:1: F401 'os' imported but unused" in output
+
+def test_older_save_does_not_mark_the_buffer_saved(window, qapp, tmp_path):
+    source = tmp_path / "notes.txt"
+    source.write_text("one\n")
+    editor = window.ouvrir_chemin(str(source))
+    wait_until(qapp, lambda: not editor.loading)
+    editor.textCursor().insertText("two\n")
+    first_snapshot = editor.document().revision()
+    editor.textCursor().insertText("three\n")
+
+    # The save of the first snapshot reports back after the second edit.
+    window.sauvegarde_terminee(str(source), 0.0, first_snapshot)
+    assert editor.document().isModified()
+    assert str(source) in window.journal.journaled
+
+    window.sauvegarde_terminee(str(source), 0.0, editor.document().revision())
+    assert not editor.document().isModified()
+
+def test_wq_closes_the_tab_once_saved(window, qapp, tmp_path):
+    source = tmp_path / "notes.txt"
+    source.write_text("one\n")
+    editor = window.ouvrir_chemin(str(source))
+    wait_until(qapp, lambda: not editor.loading)
+    editor.textCursor().insertText("two\n")
+    window.execute_command(":wq")
+    wait_until(qapp, lambda: window.tabs.count() == 0)
+    assert source.read_text() == "two\none\n"
+
+def test_wq_keeps_the_tab_if_the_save_fails(window, qapp, tmp_path):
+    folder = tmp_path / "gone"
+    folder.mkdir()
+    source = folder / "notes.txt"
+    source.write_text("one\n")
+    editor = window.ouvrir_chemin(str(source))
+    wait_until(qapp, lambda: not editor.loading)
+    editor.textCursor().insertText("two\n")
+    # The save cannot create its temporary file next to the target.
+    source.unlink()
+    folder.rmdir()
+    window.execute_command(":wq")
+    wait_until(qapp, lambda: window.warnings)
+    assert window.warnings[0].startswith(f"Échec de la sauvegarde de {source}")
+    assert window.tabs.currentWidget() is editor
+    assert str(source) in window.journal.journaled
+
+def test_refused_save_does_not_leave_a_pending_run(window, qapp, tmp_path, monkeypatch):
+    script = tmp_path / "script.py"
+    script.write_text("print('ok')\n")
+    editor = window.ouvrir_chemin(str(script))
+    wait_until(qapp, lambda: not editor.loading)
+    launched = []
+    monkeypatch.setattr(window, "lancer_script", lambda chemin, **options: launched.append(chemin))
+    # Still loading: the save, and so the run, is refused.
+    editor.loading = True
+    window.execute_command(":run")
+    assert window.action_en_attente is None
+
+    editor.loading = False
+    editor.textCursor().insertText("# edited\n")
+    window.sauvegarder_fichier()
+    wait_until(qapp, lambda: not editor.document().isModified())
+    qapp.processEvents()
+    assert launched == []
+
+    window.execute_command(":run")
+    wait_until(qapp, lambda: launched)
+    assert launched == [editor.chemin]
+
+def test_html_opens_in_the_browser_once_saved(window, qapp, tmp_path, monkeypatch):
+    import webbrowser
+    page = tmp_path / "page.html"
+    page.write_text("<p>un</p>\n")
+    editor = window.ouvrir_chemin(str(page))
+    wait_until(qapp, lambda: not editor.loading)
+    opened = []
+    monkeypatch.setattr(webbrowser, "open", lambda url: opened.append((url, page.read_text())))
+    editor.textCursor().insertText("<p>deux</p>\n")
+    window.execute_command(":run")
+    # The browser opens on the saved file, not before.
+    assert opened == []
+    wait_until(qapp, lambda: opened)
+    assert opened == [(f"file://{editor.chemin}", "<p>deux</p>\n<p>un</p>\n")]
+
+def test_terminal_log_keeps_what_the_scrollback_drops(window, qapp):
+    from terminal import terminal_log_path
+    terminal = window.terminal
+    terminal.clear_output()
+    lines = [f"ligne {i}" for i in range(terminal.max_scrollback + 500)]
+    for line in lines:
+        terminal.append_line(line)
+    terminal.flush_output()
+    assert terminal.terminal_output.document().blockCount() <= terminal.max_scrollback + 1
+    with open(terminal_log_path(), encoding='utf-8') as f:
+        assert f.read().splitlines() == lines
+
+    # A new run starts a new log.
+    terminal.clear_output()
+    terminal.append_line("$ python autre.py")
+    terminal.flush_output()
+    with open(terminal_log_path(), encoding='utf-8') as f:
+        assert f.read() == "$ python autre.py\n"
@@ -0,0 +1,33 @@
+import gc
+import time
+
+from completion import SLICE_BUDGET, CompletionEngine
+
+def test_scan_slices_stay_within_budget(qapp):
+    from PyQt6.QtGui import QTextCursor, QTextDocument
+    from PyQt6.QtWidgets import QPlainTextDocumentLayout
+    engine = CompletionEngine()
+    document = QTextDocument()
+    document.setDocumentLayout(QPlainTextDocumentLayout(document))
+    words = engine.attach(document)
+    # Long lines of words the trie has never seen are the costliest blocks.
+    QTextCursor(document).insertText("\n".join(
+        " ".join(f"name_{line}_{column}" for column in range(50)) for line in range(2000)))
+    engine.timer.stop()
+    assert engine.unscanned == {words}
+
+    durations = []
+    gc.disable()
+    try:
+        while engine.unscanned:
+            start = time.perf_counter()
+            engine.run_slice()
+            durations.append(time.perf_counter() - start)
+    finally:
+        gc.enable()
+        engine.shutdown()
+    assert len(engine.trie.counts) == 2000 * 50
+    # The time is checked after each block, which costs well under a
+    # millisecond here; the percentile leaves room for a busy machine.
+    durations.sort()
+    assert durations[len(durations) * 9 // 10] < SLICE_BUDGET + 0.002
@@ -0,0 +1,35 @@
+from edit_commands import apply_edit_command, parse_edit_command
+
+def make_document(qapp, lines):
+    from PyQt6.QtGui import QTextDocument
+    document = QTextDocument()
+    document.setPlainText("\n".join(lines))
+    return document
+
+def run(document, command):
+    edit = parse_edit_command(command, 0, document.blockCount())
+    return apply_edit_command(document, edit)
+
+def test_substitute_touches_only_changed_lines(qapp):
+    document = make_document(qapp, ["value = 1", "other = 2", "value \U0001F600 value", "last"])
+    # A user state left on a block survives only if the block is kept.
+    for block_number in range(4):
+        document.findBlockByNumber(block_number).setUserState(block_number)
+    assert run(document, ":%s/value/valeur/g") == (0, 2)
+    assert document.toPlainText() == "valeur = 1\nother = 2\nvaleur \U0001F600 valeur\nlast"
+    assert document.findBlockByNumber(1).userState() == 1
+    assert document.findBlockByNumber(3).userState() == 3
+
+    # The whole command is one undo step.
+    document.undo()
+    assert document.toPlainText() == "value = 1\nother = 2\nvalue \U0001F600 value\nlast"
+    assert not document.isUndoAvailable()
+
+def test_delete_matching_lines(qapp):
+    document = make_document(qapp, ["keep é", "drop 1", "drop 2", "keep", "drop 3"])
+    assert run(document, ":g/drop/d") == (3, 0)
+    assert document.toPlainText() == "keep é\nkeep"
+    document.undo()
+    assert document.toPlainText() == "keep é\ndrop 1\ndrop 2\nkeep\ndrop 3"
+    assert run(document, ":v/drop/d") == (2, 0)
+    assert document.toPlainText() == "drop 1\ndrop 2\ndrop 3"
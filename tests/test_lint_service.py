@@ -0,0 +1,23 @@
+import time
+
+from lint_service import LintService
+
+def test_cancelled_job_does_not_restart_the_worker(qapp):
+    service = LintService()
+    # Several seconds of cold linting, cancelled as soon as it is sent.
+    long_source = "".join(f"def function_{i}(value):\n    return value + {i}\n\n\n" for i in range(5000))
+    results = []
+    service.submit("long", long_source, lambda diagnostics: results.append(("long", diagnostics)))
+    worker = service.process.processId()
+    service.cancel("long")
+    service.submit("short", "import os\n", lambda diagnostics: results.append(("short", diagnostics)))
+
+    deadline = time.monotonic() + 60
+    while not results:
+        assert time.monotonic() < deadline, "no lint result"
+        qapp.processEvents()
+        time.sleep(0.01)
+    # The same worker, with its caches, answered both jobs.
+    assert service.process.processId() == worker
+    service.shutdown()
+    assert results == [("short", [(1, 1, "F401", "'os' imported but unused")])]
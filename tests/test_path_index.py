@@ -0,0 +1,18 @@
+import os
+
+import path_index
+from path_index import PathIndex
+
+def test_remove_tree_across_a_rebuild(monkeypatch):
+    monkeypatch.setattr(path_index, "MAX_HOLES", 4)
+    a = [os.path.join("pkg", "a", f"file_{i}.py") for i in range(3)]
+    b = [os.path.join("pkg", "b", f"file_{i}.py") for i in range(3)]
+    index = PathIndex(a + b + ["setup.py"])
+    # pkg/b is emptied first, then removing pkg/a rebuilds the index, which
+    # forgets empty directories.
+    index.remove(b)
+    index.remove_tree("pkg")
+    assert len(index) == 1
+    assert index.search("file") == []
+    assert index.search("setup") == ["setup.py"]
+    assert index.files_in(os.path.join("pkg", "a")) == set()
@@ -0,0 +1,68 @@
+import json
+import os
+import time
+
+from recovery import RecoveryJournal, file_stat, journal_path, pending_journals, recovery_dir, replay_journal
+
+def wait_for_lines(journal, chemin, count):
+    # The journal thread flushes in batches; flush_now skips the wait.
+    journal.flush_now.set()
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        try:
+            with open(journal_path(journal.dossier, chemin), encoding='utf-8') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            lines = []
+        if len(lines) >= count:
+            return lines
+        time.sleep(0.01)
+    raise AssertionError(f"The journal of {chemin} never got {count} lines")
+
+def test_journal_starts_from_the_file_as_loaded(qapp, tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path / "data"))
+    path = tmp_path / "notes.txt"
+    path.write_text("abc\n")
+    disk_stat = file_stat(str(path))
+    journal = RecoveryJournal()
+    journal.record(str(path), 0, 0, "x", disk_stat)
+    header = json.loads(wait_for_lines(journal, str(path), 2)[0])
+    assert (header["size"], header["mtime_ns"]) == disk_stat
+    assert replay_journal(journal_path(journal.dossier, str(path))) == "xabc\n"
+    journal.shutdown()
+
+def test_file_changed_before_the_first_flush(qapp, tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path / "data"))
+    path = tmp_path / "notes.txt"
+    path.write_text("abc\n")
+    disk_stat = file_stat(str(path))
+    # Rewritten by another program after the buffer was loaded, before the
+    # journal thread writes the header: the edits do not apply to it.
+    path.write_text("rewritten elsewhere\n")
+    journal = RecoveryJournal()
+    journal.record(str(path), 0, 0, "x", disk_stat)
+    header = json.loads(wait_for_lines(journal, str(path), 2)[0])
+    assert (header["size"], header["mtime_ns"]) == disk_stat
+    assert replay_journal(journal_path(journal.dossier, str(path))) is None
+    journal.shutdown()
+
+def test_journals_of_running_editors_are_not_pending(qapp, tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path / "data"))
+    path = tmp_path / "notes.txt"
+    path.write_text("abc\n")
+    # Two editors, one of them this one, both running.
+    mine, other = RecoveryJournal(), RecoveryJournal()
+    mine.record(str(path), 0, 0, "x", file_stat(str(path)))
+    other.record(str(path), 3, 0, "y", file_stat(str(path)))
+    wait_for_lines(mine, str(path), 2)
+    wait_for_lines(other, str(path), 2)
+    assert pending_journals() == []
+
+    # The other one dies: its lock goes with it, its journal stays.
+    other.lock.close()
+    assert pending_journals() == [(str(path), journal_path(other.dossier, str(path)))]
+    assert replay_journal(journal_path(other.dossier, str(path))) == "abcy\n"
+    other.shutdown()
+    mine.shutdown()
+    assert pending_journals() == []
+    assert os.listdir(recovery_dir()) == []
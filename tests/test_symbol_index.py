@@ -0,0 +1,33 @@
+from symbol_index import SymbolIndex
+
+def make_project(root, count):
+    for i in range(count):
+        (root / f"module_{i}.py").write_text(f"def function_{i}():\n    return {i}\n")
+
+def test_update_indexes_definitions(tmp_path):
+    make_project(tmp_path, 3)
+    index = SymbolIndex(str(tmp_path / "index.sqlite"))
+    reports = []
+    assert index.update(str(tmp_path), progress=lambda done, total: reports.append((done, total)))
+    assert reports[-1] == (3, 3)
+    assert [row[0] for row in index.definitions("function_1")] == [str(tmp_path / "module_1.py")]
+    index.close()
+
+def test_interrupted_update_is_not_reported_done(tmp_path):
+    make_project(tmp_path, 3)
+    index = SymbolIndex(str(tmp_path / "index.sqlite"))
+    # Two checks while the files are listed, then a stop as soon as the
+    # first parsed file comes back.
+    checks = []
+    def should_stop():
+        checks.append(None)
+        return len(checks) > 2
+    reports = []
+    assert not index.update(str(tmp_path), should_stop, lambda done, total: reports.append((done, total)))
+    assert (3, 3) not in reports
+
+    # The next update picks up what the interrupted one left.
+    assert index.update(str(tmp_path), progress=lambda done, total: reports.append((done, total)))
+    assert reports[-1] == (3, 3)
+    assert index.definitions("function_2")
+    index.close()